@@ -4,6 +4,9 @@
 
 local MapaModule = {}
 
+-- Símbolos das linhas RLE do esquema v2, na ordem da paleta (igual ao TileGrid.RLE_SYMBOLS do Python)
+local RLE_SYMBOLS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
 -- Função para desserializar JSON (usa HttpService)
 function MapaModule.FromJSON(json)
   local httpService = game:GetService("HttpService")
@@ -18,10 +21,66 @@ function MapaModule.FromJSON(json)
   return result
 end
 
+-- Percorre os tiles do mapa chamando callback(tileId, x, y); para se o callback retornar false
+-- Aceita o esquema v1 (mapa.tiles = lista de {tileId, x, y}) e o v2
+-- (mapa.versao = 2, mapa.palette + mapa.rows com uma string RLE por linha:
+-- [contagem]símbolo, contagem omitida quando 1, "." = célula vazia)
+function MapaModule.ForEachTile(mapa, callback)
+  if mapa.versao == 2 then
+    local tileOf = {}
+    for i, tileId in ipairs(mapa.palette) do
+      tileOf[string.sub(RLE_SYMBOLS, i, i)] = tileId
+    end
+
+    for row, data in ipairs(mapa.rows) do
+      local y = row - 1
+      local x = 0
+      for count, symbol in string.gmatch(data, "(%d*)([%a%.])") do
+        local run = tonumber(count) or 1
+        local tileId = tileOf[symbol]
+        if tileId then
+          for _ = 1, run do
+            if callback(tileId, x, y) == false then
+              return
+            end
+            x = x + 1
+          end
+        else
+          x = x + run
+        end
+      end
+    end
+    return
+  end
+
+  for _, tile in ipairs(mapa.tiles or {}) do
+    if callback(tile.tileId, tile.x, tile.y) == false then
+      return
+    end
+  end
+end
+
+-- Conta os tiles preenchidos (v1 ou v2) sem criar instâncias
+function MapaModule.CountTiles(mapa)
+  if mapa.versao ~= 2 then
+    return #(mapa.tiles or {})
+  end
+
+  local total = 0
+  for _, data in ipairs(mapa.rows or {}) do
+    for count, symbol in string.gmatch(data, "(%d*)([%a%.])") do
+      if symbol ~= "." then
+        total = total + (tonumber(count) or 1)
+      end
+    end
+  end
+  return total
+end
+
 -- Função para construir mapa no Workspace
 -- Parâmetros:
 --   workspace: Instance do Workspace (ou pasta onde construir)
---   mapa: Tabela desserializada do JSON
+--   mapa: Tabela desserializada do JSON (esquema v1 ou v2)
 --   options: Tabela com configurações opcionais
 --     - baseFolderName: Nome da pasta raiz (default: "GeneratedMaps")
 --     - maxParts: Limite máximo de partes (default: 5000)
@@ -44,7 +103,14 @@ function MapaModule.BuildFromMapa(workspace, mapa, options)
   }
 
   -- Validar mapa
-  if not mapa or not mapa.tiles or not mapa.setores then
+  if not mapa or not mapa.setores then
+    error("Mapa inválido: faltam campos obrigatórios")
+  end
+  if mapa.versao == 2 then
+    if not mapa.palette or not mapa.rows then
+      error("Mapa v2 inválido: faltam palette/rows")
+    end
+  elseif not mapa.tiles then
     error("Mapa inválido: faltam campos obrigatórios")
   end
 
@@ -91,24 +157,24 @@ function MapaModule.BuildFromMapa(workspace, mapa, options)
   tilesFolder.Name = "Tiles"
   tilesFolder.Parent = baseFolder
 
-  for _, tile in ipairs(mapa.tiles or {}) do
+  MapaModule.ForEachTile(mapa, function(tileId, x, y)
     if partCount >= maxParts then
       warn("Limite de partes atingido: " .. maxParts .. ". Alguns tiles não foram criados.")
-      break
+      return false
     end
 
     local tilePart = Instance.new("Part")
-    tilePart.Name = "Tile_" .. (tile.tileId or "unknown")
+    tilePart.Name = "Tile_" .. (tileId or "unknown")
     tilePart.Shape = Enum.PartType.Block
     tilePart.Size = Vector3.new(tileSize, tileSize, tileSize)
     tilePart.Position = Vector3.new(
-      (tile.x + 0.5) * tileSize,
+      (x + 0.5) * tileSize,
       tileSize / 2,
-      (tile.y + 0.5) * tileSize
+      (y + 0.5) * tileSize
     )
 
     -- Aplicar cor baseado no tipo de tile
-    local tileType = tile.tileId or "chao"
+    local tileType = tileId or "chao"
     if string.find(tileType, "parede") then
       tilePart.BrickColor = colorScheme.parede or BrickColor.new("Dark stone grey")
     elseif string.find(tileType, "porta") then
@@ -128,7 +194,7 @@ function MapaModule.BuildFromMapa(workspace, mapa, options)
     tilePart.Parent = tilesFolder
 
     partCount = partCount + 1
-  end
+  end)
 
   -- Retornar estatísticas
   return {
@@ -169,7 +235,7 @@ function MapaModule.GetMapStats(mapa)
     seed = mapa.seed,
     dimensoes = mapa.dimensoes,
     numSetores = #(mapa.setores or {}),
-    numTiles = #(mapa.tiles or {}),
+    numTiles = MapaModule.CountTiles(mapa),
     stats = mapa.metadados and mapa.metadados.stats,
   }
 end
@@ -0,0 +1,55 @@
+"""
+EZ STUDIOS - Benchmark da emissão Luau
+Mede o tempo do RobloxAdapter em mapas crescentes: o tempo por tile deve ficar constante
+"""
+
+import io
+import sys
+import time
+from array import array
+from typing import List, Tuple
+from types import MapaGerado, TileGrid
+from roblox_adapter import RobloxAdapter
+
+SIZES: Tuple[int, ...] = (50, 100, 200, 400)
+
+def make_map(side: int) -> MapaGerado:
+    """Mapa quadrado sintético (sem WFC) para isolar o custo da emissão"""
+    palette = ["chao_1", "parede_1", "porta_1"]
+    cells = array("H", (i % 3 for i in range(side * side)))
+    return MapaGerado(
+        id=f"bench_{side}",
+        seed="bench",
+        setores=[],
+        tiles=TileGrid(side, side, palette, cells),
+        largura=side,
+        altura=side
+    )
+
+def run(sizes: Tuple[int, ...] = SIZES, repeat: int = 3) -> List[Tuple[int, float]]:
+    """Retorna (tiles, melhor tempo em segundos) por tamanho"""
+    results = []
+    for side in sizes:
+        mapa = make_map(side)
+        adapter = RobloxAdapter(max_parts=side * side)
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            adapter.write_luau_script(mapa, io.StringIO())
+            best = min(best, time.perf_counter() - start)
+        results.append((side * side, best))
+    return results
+
+def main() -> int:
+    results = run()
+    for tiles, seconds in results:
+        print(f"{tiles:>8} tiles  {seconds * 1000:9.1f} ms  {seconds / tiles * 1e6:6.2f} us/tile")
+
+    # Linear: o custo por tile do maior mapa fica perto do menor
+    (small_tiles, small), (big_tiles, big) = results[0], results[-1]
+    ratio = (big / big_tiles) / (small / small_tiles)
+    print(f"razão us/tile (maior/menor): {ratio:.2f}")
+    return 0 if ratio < 2.0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -36,8 +36,8 @@ class BSPGenerator:
         self.min_size = min_size
         self.max_depth = max_depth
 
-        if seed:
-            random.seed(seed)
+        # Stream próprio: gerações concorrentes não interferem entre si
+        self.rng = random.Random(seed) if seed else random.Random()
 
         self.root = BSPNode(0, 0, largura, altura)
 
@@ -61,7 +61,7 @@ class BSPGenerator:
             return
 
         if can_split_h and can_split_v:
-            split_horizontal = random.random() > 0.5
+            split_horizontal = self.rng.random() > 0.5
         elif can_split_h:
             split_horizontal = True
         else:
@@ -71,7 +71,7 @@ class BSPGenerator:
             # Divisão horizontal
             split_min = self.min_size
             split_max = node.altura - self.min_size
-            split_y = random.randint(split_min, split_max)
+            split_y = self.rng.randint(split_min, split_max)
 
             node.left = BSPNode(
                 node.x,
@@ -89,7 +89,7 @@ class BSPGenerator:
             # Divisão vertical
             split_min = self.min_size
             split_max = node.largura - self.min_size
-            split_x = random.randint(split_min, split_max)
+            split_x = self.rng.randint(split_min, split_max)
 
             node.left = BSPNode(
                 node.x,
@@ -164,7 +164,7 @@ class BSPGenerator:
         # Alguns aleatórios: loja
         num_lojas = min(2, len(setores) // 3)
         if len(setores) > 3:
-            loja_indices = random.sample(range(1, len(setores) - 1), num_lojas)
+            loja_indices = self.rng.sample(range(1, len(setores) - 1), num_lojas)
             for idx in loja_indices:
                 setores[idx].tipo = "loja"
 
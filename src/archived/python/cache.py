@@ -0,0 +1,120 @@
+"""
+EZ STUDIOS - Cache de mapas endereçado por conteúdo
+Mesma config normalizada + seed + tileset => mesmo mapa, sem regenerar
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+from types import Tile
+
+def tileset_fingerprint(tiles: List[Tile]) -> str:
+    """Hash estável do tileset (ordem dos tiles importa: define os índices)"""
+    payload = json.dumps([t.to_dict() for t in tiles], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class MapCache:
+    """Cache em dois níveis: LRU em memória limitado por bytes + diretório opcional
+
+    Os valores são bytes já serializados; o tamanho deles é o que conta
+    para a evicção.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.current_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(config: Dict[str, Any], seed: str, fingerprint: str) -> str:
+        """Chave de conteúdo: config normalizada (chaves ordenadas) + seed + tileset"""
+        payload = json.dumps(
+            {"config": config, "seed": seed, "tileset": fingerprint},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Busca na memória e depois no disco (promovendo para a memória)"""
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return payload
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    payload = f.read()
+            except FileNotFoundError:
+                payload = None
+            if payload is not None:
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                self._put_memory(key, payload)
+                return payload
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, payload: bytes) -> None:
+        """Guarda na memória e, se configurado, no disco"""
+        self._put_memory(key, payload)
+
+        if self.disk_dir:
+            # Escrita atômica: outro processo nunca lê arquivo pela metade
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+
+    def _put_memory(self, key: str, payload: bytes) -> None:
+        """Insere no LRU e descarta os menos usados até caber em max_bytes"""
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= len(old)
+            self._entries[key] = payload
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de hit/miss e ocupação"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "diskHits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes
+            }
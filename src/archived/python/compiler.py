@@ -3,20 +3,106 @@ EZ STUDIOS - Compilador de Intenção
 Converte intenções em regras e gera mapas procedurais
 """
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Iterator, Tuple, Callable
+import base64
+import hashlib
+import inspect
+import json
 import uuid
 from types import (
-    Intencao, MapaGerado, Tile, Setor, TileInstance,
+    Intencao, MapaGerado, Tile, Setor, TileGrid,
     LogEntrada, WFCContradiction
 )
 from wfc import WFCGrid
+from wfc_bitset import BitsetWFCGrid
+from wfc_chunked import ChunkedWFCGrid
+from wfc_sectors import SectorWFCGrid
+from wfc_overlapping import OverlappingWFCGrid, example_fingerprint
 from bsp import BSPGenerator
+from cache import MapCache
+from tileset import CompiledTileset, compile_tileset
+from profiler import GenerationProfiler, NULL_PROFILER
+
+# Motores WFC disponíveis ("set" e "bitset" dão a mesma saída por seed)
+WFC_ENGINES = {
+    "set": WFCGrid,
+    "bitset": BitsetWFCGrid,
+    "chunked": ChunkedWFCGrid,
+    "sectors": SectorWFCGrid,
+    # Precisa de wfc_options={"example": MapaGerado, "n": 3}
+    "overlapping": OverlappingWFCGrid,
+}
+
+# NumPy é opcional: sem ele o modo "auto" fica no bitset
+try:
+    from wfc_numpy import NumpyWFCGrid
+    WFC_ENGINES["numpy"] = NumpyWFCGrid
+except ImportError:
+    pass
+
+# A partir de quantas células o modo "auto" usa o backend NumPy
+NUMPY_AUTO_THRESHOLD = 128 * 128
+
+# Executores de lote: cada gerador tem seu próprio random.Random,
+# então threads também reproduzem a mesma saída por seed
+BATCH_EXECUTORS = {
+    "process": ProcessPoolExecutor,
+    "thread": ThreadPoolExecutor,
+}
+
+def engine_accepts(engine: str, options: Dict[str, Any]) -> bool:
+    """O construtor do motor aceita todas as opções dadas?"""
+    params = inspect.signature(WFC_ENGINES[engine]).parameters
+    return all(name in params for name in options)
+
+def derive_seed(base_seed: str, index: int) -> str:
+    """Seed determinística do job `index` de um lote (não depende de workers)"""
+    return hashlib.sha256(f"{base_seed}:{index}".encode("utf-8")).hexdigest()[:8]
+
+def _generate_job(
+    wfc_engine: str,
+    wfc_options: Dict[str, Any],
+    cache: Optional[MapCache],
+    profiler: Optional[Callable[[], GenerationProfiler]],
+    intencao: Intencao,
+    student_id: str,
+    seed: str
+) -> Tuple[Optional[MapaGerado], LogEntrada]:
+    """Gera um mapa num compilador isolado; roda no processo atual ou num worker"""
+    compiler = IntentionCompiler(
+        wfc_engine=wfc_engine, wfc_options=wfc_options, cache=cache, profiler=profiler
+    )
+    try:
+        mapa = compiler.generate_from_intention(intencao, student_id=student_id, seed=seed)
+    except Exception:
+        mapa = None
+    return mapa, compiler.logs[-1]
 
 class IntentionCompiler:
     """Compila intenções em mapas gerados"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        wfc_engine: str = "auto",
+        wfc_options: Optional[Dict[str, Any]] = None,
+        cache: Optional[MapCache] = None,
+        profiler: Optional[Callable[[], GenerationProfiler]] = None,
+        on_stats: Optional[Callable[[LogEntrada], None]] = None
+    ):
+        if wfc_engine != "auto" and wfc_engine not in WFC_ENGINES:
+            raise ValueError(f"Motor WFC desconhecido: {wfc_engine}")
+        self.wfc_engine = wfc_engine
+        # Repassadas ao motor escolhido, ex.: {"propagator": "ac4"} no bitset
+        self.wfc_options: Dict[str, Any] = dict(wfc_options or {})
+        # Cache opcional de mapas repetidos (mesma config + seed + tileset)
+        self.cache = cache
+        # Fábrica de profiler por geração (ex.: GenerationProfiler); sem ela nada é medido
+        self.profiler = profiler
+        # Recebe o LogEntrada de cada geração (sucesso ou erro), com as stats em map_stats
+        self.on_stats = on_stats
+        self._tileset: Optional[CompiledTileset] = None
         self.logs: List[LogEntrada] = []
 
     def create_basic_tiles(self) -> List[Tile]:
@@ -62,6 +148,12 @@ class IntentionCompiler:
 
         return [chao, parede, porta]
 
+    def compiled_tileset(self) -> CompiledTileset:
+        """Tileset básico validado e compilado uma vez por compilador"""
+        if self._tileset is None:
+            self._tileset = compile_tileset(self.create_basic_tiles())
+        return self._tileset
+
     def map_intention_to_config(self, intencao: Intencao) -> Dict[str, Any]:
         """Mapeia intenção para configuração de geração"""
         params = intencao.parametros
@@ -87,24 +179,71 @@ class IntentionCompiler:
 
         return config
 
-    def generate_from_intention(
-        self,
-        intencao: Intencao,
-        student_id: str = "aluno_padrao",
-        seed: Optional[str] = None
-    ) -> MapaGerado:
-        """Pipeline completo: Intenção → Mapa"""
+    def select_wfc_engine(self, config: Dict[str, Any]) -> str:
+        """Escolhe o motor WFC; no modo "auto" mapas grandes vão para o NumPy
 
-        if seed is None:
-            seed = str(uuid.uuid4())[:8]
+        Só se o NumPy aceitar as wfc_options: com opções do bitset
+        (propagator, backtrack_budget...) o "auto" fica no bitset, em vez de
+        a mesma config quebrar quando o mapa passa do limite.
+        """
+        if self.wfc_engine != "auto":
+            return self.wfc_engine
+        if (
+            "numpy" in WFC_ENGINES
+            and config["largura"] * config["altura"] >= NUMPY_AUTO_THRESHOLD
+            and engine_accepts("numpy", self.wfc_options)
+        ):
+            return "numpy"
+        return "bitset"
 
-        start_time = datetime.utcnow()
+    def cache_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Config normalizada para a chave do cache (o motor muda o resultado)"""
+        wfc_options = dict(self.wfc_options)
+        if "example" in wfc_options:
+            # O mapa de exemplo entra na chave pelo conteúdo
+            wfc_options["example"] = example_fingerprint(wfc_options["example"])
+        return {
+            **config,
+            "wfc_engine": self.select_wfc_engine(config),
+            "wfc_options": wfc_options
+        }
 
-        try:
-            # 1. Mapear intenção para configuração
-            config = self.map_intention_to_config(intencao)
+    @staticmethod
+    def encode_layout(setores: List[Setor], tiles: TileGrid) -> bytes:
+        """Serializa setores e o grid de tiles (paleta + células em base64) para o cache"""
+        payload = {
+            "setores": [s.to_dict() for s in setores],
+            "largura": tiles.largura,
+            "altura": tiles.altura,
+            "palette": tiles.palette,
+            "cells": base64.b64encode(tiles.to_bytes()).decode("ascii")
+        }
+        return json.dumps(payload, separators=(",", ":")).encode("utf-8")
 
-            # 2. Gerar setores com BSP
+    @staticmethod
+    def decode_layout(payload: bytes) -> Tuple[List[Setor], TileGrid]:
+        """Inverso de encode_layout"""
+        data = json.loads(payload)
+        setores = [Setor.from_dict(s) for s in data["setores"]]
+        tiles = TileGrid.from_bytes(
+            data["largura"], data["altura"], data["palette"], base64.b64decode(data["cells"])
+        )
+        return setores, tiles
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Contadores do cache (vazio se o cache estiver desligado)"""
+        return self.cache.stats() if self.cache is not None else {}
+
+    def _generate_layout(
+        self,
+        config: Dict[str, Any],
+        tiles_def: CompiledTileset,
+        seed: str,
+        profiler: GenerationProfiler = NULL_PROFILER
+    ) -> Tuple[List[Setor], TileGrid]:
+        """Roda BSP + WFC e extrai os tiles para o grid do mapa"""
+        # Setores com BSP
+        with profiler.phase("bsp"):
             bsp = BSPGenerator(
                 largura=config["largura"],
                 altura=config["altura"],
@@ -118,49 +257,104 @@ class IntentionCompiler:
             if config["tem_boss"]:
                 setores = bsp.assign_types(setores)
 
-            # 3. Criar tiles
-            tiles_def = self.create_basic_tiles()
-
-            # 4. Gerar mapa com WFC
-            wfc_grid = WFCGrid(
+        # Mapa com WFC; o motor "sectors" resolve cada folha do BSP separadamente
+        engine = self.select_wfc_engine(config)
+        engine_options = dict(self.wfc_options)
+        if engine == "sectors":
+            engine_options["setores"] = setores
+        with profiler.phase("wfc"):
+            wfc_grid = WFC_ENGINES[engine](
                 width=config["largura"],
                 height=config["altura"],
                 tiles=tiles_def,
-                seed=seed
+                seed=seed,
+                **engine_options
             )
-            wfc_grid.run_to_completion()
-
-            # 5. Extrair tiles instanciados
-            tile_instances = []
-            for y in range(wfc_grid.height):
-                for x in range(wfc_grid.width):
-                    tile_id = wfc_grid.get_tile_at(x, y)
-                    if tile_id:
-                        tile_instances.append(
-                            TileInstance(tile_id=tile_id, x=x, y=y)
-                        )
-
-            # 6. Criar mapa final
+            profiler.instrument_wfc(wfc_grid)
+            try:
+                # Um passo por célula (+ retrocessos); o limite padrão barraria mapas > 100x100
+                wfc_grid.run_to_completion(
+                    max_iterations=config["largura"] * config["altura"] + 1
+                    + self.wfc_options.get("backtrack_budget", 0)
+                )
+            finally:
+                profiler.collect_wfc(wfc_grid)
+
+        # Extrair tiles direto para o grid compacto (paleta + array)
+        with profiler.phase("extracao"):
+            tile_grid = wfc_grid.to_tile_grid()
+
+        return setores, tile_grid
+
+    def generate_from_intention(
+        self,
+        intencao: Intencao,
+        student_id: str = "aluno_padrao",
+        seed: Optional[str] = None
+    ) -> MapaGerado:
+        """Pipeline completo: Intenção → Mapa"""
+
+        if seed is None:
+            seed = str(uuid.uuid4())[:8]
+
+        start_time = datetime.utcnow()
+        profiler = self.profiler() if self.profiler is not None else NULL_PROFILER
+        started = profiler.clock()
+        total_recorded = False
+
+        try:
+            # 1. Mapear intenção para configuração
+            with profiler.phase("config"):
+                config = self.map_intention_to_config(intencao)
+
+            # 2. Tiles (compilados uma vez, reaproveitados entre mapas)
+            with profiler.phase("tiles"):
+                tiles_def = self.compiled_tileset()
+
+            # 3. Consultar cache antes de rodar BSP/WFC
+            cache_key = None
+            cached = None
+            if self.cache is not None:
+                with profiler.phase("cache"):
+                    cache_key = MapCache.make_key(
+                        self.cache_config(config), seed, tiles_def.fingerprint
+                    )
+                    cached = self.cache.get(cache_key)
+                    if cached is not None:
+                        setores, tile_grid = self.decode_layout(cached)
+
+            if cached is None:
+                # 4. Gerar setores (BSP) e tiles (WFC)
+                setores, tile_grid = self._generate_layout(config, tiles_def, seed, profiler)
+                if cache_key is not None:
+                    with profiler.phase("cache"):
+                        self.cache.put(cache_key, self.encode_layout(setores, tile_grid))
+            profiler.add_time("total", profiler.clock() - started)
+            total_recorded = True
+
+            # 5. Criar mapa final
+            num_tiles = len(tile_grid)
             mapa = MapaGerado(
                 id=f"mapa_{uuid.uuid4().hex[:8]}",
                 seed=seed,
                 largura=config["largura"],
                 altura=config["altura"],
                 setores=setores,
-                tiles=tile_instances,
+                tiles=tile_grid,
                 metadados={
                     "autorId": student_id,
                     "criadoEm": start_time.isoformat(),
                     "intencaoId": intencao.id,
                     "stats": {
                         "numSetores": len(setores),
-                        "numTiles": len(tile_instances),
-                        "densidade": len(tile_instances) / (config["largura"] * config["altura"])
+                        "numTiles": num_tiles,
+                        "densidade": num_tiles / (config["largura"] * config["altura"]),
+                        **profiler.stats()
                     }
                 }
             )
 
-            # 7. Log de sucesso
+            # 6. Log de sucesso
             log = LogEntrada(
                 timestamp=datetime.utcnow().isoformat(),
                 student_id=student_id,
@@ -170,16 +364,19 @@ class IntentionCompiler:
                 seed=seed,
                 map_stats={
                     "numSetores": len(setores),
-                    "numTiles": len(tile_instances)
+                    "numTiles": num_tiles,
+                    **profiler.stats()
                 },
                 build_status="success"
             )
+            if self.cache is not None:
+                log.map_stats["cacheHit"] = int(cached is not None)
             self.logs.append(log)
 
-            return mapa
-
         except Exception as e:
-            # Log de erro
+            # Log de erro (com as fases medidas até a falha; total uma vez só)
+            if not total_recorded:
+                profiler.add_time("total", profiler.clock() - started)
             log = LogEntrada(
                 timestamp=datetime.utcnow().isoformat(),
                 student_id=student_id,
@@ -187,14 +384,88 @@ class IntentionCompiler:
                 categoria=intencao.categoria,
                 engine_alvo="Roblox",
                 seed=seed,
-                map_stats={"numSetores": 0, "numTiles": 0},
+                map_stats={"numSetores": 0, "numTiles": 0, **profiler.stats()},
                 build_status="error",
                 error_type=type(e).__name__,
                 error_message=str(e)
             )
             self.logs.append(log)
+            self._emit_stats(log)
             raise
 
+        self._emit_stats(log)
+        return mapa
+
+    def _emit_stats(self, log: LogEntrada) -> None:
+        """Entrega o log (com as stats do profiler) ao hook de monitoramento"""
+        if self.on_stats is not None:
+            self.on_stats(log)
+
+    def iter_generate_many(
+        self,
+        intents: List[Intencao],
+        student_id: str = "aluno_padrao",
+        seed: Optional[str] = None,
+        workers: int = 1,
+        executor: str = "process"
+    ) -> Iterator[Tuple[int, Optional[MapaGerado], LogEntrada]]:
+        """Gera um lote e entrega (índice, mapa, log) conforme cada job termina
+
+        executor: "process" (um núcleo por worker) ou "thread" (mesmo processo).
+        Mapas com erro chegam como None; o log traz o motivo.
+        Não registra em self.logs (ver generate_many).
+        """
+        if executor not in BATCH_EXECUTORS:
+            raise ValueError(f"Executor desconhecido: {executor}")
+        if seed is None:
+            seed = str(uuid.uuid4())[:8]
+
+        # O cache em memória só é compartilhável entre threads
+        shared_cache = self.cache if executor == "thread" or workers <= 1 else None
+        jobs = [
+            (
+                self.wfc_engine, self.wfc_options, shared_cache, self.profiler,
+                intencao, student_id, derive_seed(seed, i)
+            )
+            for i, intencao in enumerate(intents)
+        ]
+
+        # O hook roda aqui, no processo que chamou, e não nos workers
+        if workers <= 1:
+            for i, job in enumerate(jobs):
+                mapa, log = _generate_job(*job)
+                self._emit_stats(log)
+                yield i, mapa, log
+            return
+
+        with BATCH_EXECUTORS[executor](max_workers=workers) as pool:
+            futures = {pool.submit(_generate_job, *job): i for i, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                mapa, log = future.result()
+                self._emit_stats(log)
+                yield futures[future], mapa, log
+
+    def generate_many(
+        self,
+        intents: List[Intencao],
+        student_id: str = "aluno_padrao",
+        seed: Optional[str] = None,
+        workers: int = 1,
+        executor: str = "process"
+    ) -> List[Optional[MapaGerado]]:
+        """Gera um lote de intenções em paralelo; mapas e logs na ordem de entrada"""
+        mapas: List[Optional[MapaGerado]] = [None] * len(intents)
+        logs: List[Optional[LogEntrada]] = [None] * len(intents)
+
+        for i, mapa, log in self.iter_generate_many(
+            intents, student_id, seed, workers, executor
+        ):
+            mapas[i] = mapa
+            logs[i] = log
+
+        self.logs.extend(logs)
+        return mapas
+
     def get_logs_json(self) -> str:
         """Retorna logs em formato JSON"""
         import json
@@ -0,0 +1,267 @@
+"""
+EZ STUDIOS - Formato binário de mapas (.ezmap)
+Cabeçalho + setores + paleta + grid RLE por linha, legível via mmap
+"""
+
+import io
+import json
+import mmap
+import struct
+from array import array
+from typing import List, Dict, Any, Optional, BinaryIO, Tuple, Union
+from types import MapaGerado, Setor, TileGrid
+from profiler import GenerationProfiler, NULL_PROFILER
+
+MAGIC = b"EZMP"
+VERSION = 1
+
+# magic, versão, flags, largura, altura, offset do índice de linhas
+_HEADER = struct.Struct("<4sHHIIQ")
+_SETOR = struct.Struct("<iiII")
+_OFFSET = struct.Struct("<Q")
+
+# Tipos de setor em ordem fixa (1 byte no arquivo)
+SETOR_TIPOS: Tuple[str, ...] = ("spawn", "boss", "loja", "hub", "generico")
+
+def _write_varint(out: bytearray, value: int) -> None:
+    """LEB128 sem sinal"""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varint(buf, pos: int) -> Tuple[int, int]:
+    """Retorna (valor, próxima posição)"""
+    value = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+def _write_str(out: bytearray, text: str) -> None:
+    data = text.encode("utf-8")
+    _write_varint(out, len(data))
+    out += data
+
+def _read_str(buf, pos: int) -> Tuple[str, int]:
+    size, pos = _read_varint(buf, pos)
+    return bytes(buf[pos:pos + size]).decode("utf-8"), pos + size
+
+def _encode_row(cells, start: int, width: int) -> bytearray:
+    """Linha em pares (tamanho da sequência, código); código 0 = vazio, senão paleta + 1"""
+    out = bytearray()
+    empty = TileGrid.EMPTY
+    x = 0
+    while x < width:
+        code = cells[start + x]
+        run = 1
+        while x + run < width and cells[start + x + run] == code:
+            run += 1
+        _write_varint(out, run)
+        _write_varint(out, 0 if code == empty else code + 1)
+        x += run
+    return out
+
+def write_map(mapa: MapaGerado, fp: BinaryIO, profiler: GenerationProfiler = NULL_PROFILER) -> None:
+    """Grava o mapa em fp (precisa de seek: o índice de linhas é preenchido no fim)
+
+    O tempo entra na fase "serializacao" do profiler.
+    """
+    with profiler.phase("serializacao"):
+        _write_map(mapa, fp)
+
+def _write_map(mapa: MapaGerado, fp: BinaryIO) -> None:
+    grid = mapa.tiles
+    width, height = mapa.largura, mapa.altura
+
+    prelude = bytearray()
+    _write_str(prelude, mapa.id)
+    _write_str(prelude, mapa.seed)
+    _write_str(prelude, json.dumps(mapa.metadados, separators=(",", ":"), default=str))
+
+    _write_varint(prelude, len(mapa.setores))
+    for setor in mapa.setores:
+        _write_str(prelude, setor.id)
+        prelude += _SETOR.pack(setor.x, setor.y, setor.largura, setor.altura)
+        prelude.append(SETOR_TIPOS.index(setor.tipo))
+
+    _write_varint(prelude, len(grid.palette))
+    for tile_id in grid.palette:
+        _write_str(prelude, tile_id)
+
+    base = fp.tell()
+    index_offset = _HEADER.size + len(prelude)
+    fp.write(_HEADER.pack(MAGIC, VERSION, 0, width, height, index_offset))
+    fp.write(prelude)
+
+    # Índice: altura + 1 offsets absolutos; a linha y ocupa [off[y], off[y+1])
+    fp.write(bytes(_OFFSET.size * (height + 1)))
+    offsets = []
+    position = index_offset + _OFFSET.size * (height + 1)
+    for y in range(height):
+        offsets.append(position)
+        row = _encode_row(grid.cells, y * width, width)
+        fp.write(row)
+        position += len(row)
+    offsets.append(position)
+
+    end = fp.tell()
+    fp.seek(base + index_offset)
+    fp.write(b"".join(_OFFSET.pack(off) for off in offsets))
+    fp.seek(end)
+
+def encode_map(mapa: MapaGerado, profiler: GenerationProfiler = NULL_PROFILER) -> bytes:
+    """Mapa inteiro em bytes no formato .ezmap"""
+    buffer = io.BytesIO()
+    write_map(mapa, buffer, profiler)
+    return buffer.getvalue()
+
+def save_map(mapa: MapaGerado, path: str, profiler: GenerationProfiler = NULL_PROFILER) -> None:
+    with open(path, "wb") as f:
+        write_map(mapa, f, profiler)
+
+class MapFileReader:
+    """Leitor de .ezmap sobre mmap (ou bytes): consulta tiles e linhas sem decodificar o mapa
+
+    O cabeçalho, os setores e a paleta são lidos na abertura; as linhas do
+    grid só são decodificadas quando pedidas.
+    """
+
+    def __init__(self, source: Union[str, bytes, bytearray, memoryview]):
+        self._file = None
+        self._mmap = None
+        if isinstance(source, str):
+            self._file = open(source, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._buf = self._mmap
+        else:
+            self._buf = memoryview(source)
+
+        if len(self._buf) < _HEADER.size:
+            raise ValueError("Arquivo de mapa truncado")
+        magic, version, _flags, self.largura, self.altura, self._index_offset = (
+            _HEADER.unpack_from(self._buf, 0)
+        )
+        if magic != MAGIC:
+            raise ValueError("Arquivo não é um mapa .ezmap")
+        if version != VERSION:
+            raise ValueError(f"Versão de mapa não suportada: {version}")
+
+        pos = _HEADER.size
+        self.id, pos = _read_str(self._buf, pos)
+        self.seed, pos = _read_str(self._buf, pos)
+        metadados, pos = _read_str(self._buf, pos)
+        self.metadados: Dict[str, Any] = json.loads(metadados)
+
+        count, pos = _read_varint(self._buf, pos)
+        self.setores: List[Setor] = []
+        for _ in range(count):
+            setor_id, pos = _read_str(self._buf, pos)
+            x, y, largura, altura = _SETOR.unpack_from(self._buf, pos)
+            pos += _SETOR.size
+            tipo = SETOR_TIPOS[self._buf[pos]]
+            pos += 1
+            self.setores.append(Setor(setor_id, x, y, largura, altura, tipo))
+
+        count, pos = _read_varint(self._buf, pos)
+        self.palette: List[str] = []
+        for _ in range(count):
+            tile_id, pos = _read_str(self._buf, pos)
+            self.palette.append(tile_id)
+
+    def _row_bounds(self, y: int) -> Tuple[int, int]:
+        offset = self._index_offset + _OFFSET.size * y
+        start, = _OFFSET.unpack_from(self._buf, offset)
+        end, = _OFFSET.unpack_from(self._buf, offset + _OFFSET.size)
+        return start, end
+
+    def _row_runs(self, y: int):
+        """Gera (tamanho, código) da linha y"""
+        pos, end = self._row_bounds(y)
+        buf = self._buf
+        while pos < end:
+            run, pos = _read_varint(buf, pos)
+            code, pos = _read_varint(buf, pos)
+            yield run, code
+
+    def get_tile_at(self, x: int, y: int) -> Optional[str]:
+        """Decodifica só as sequências da linha y até a coluna x"""
+        if not (0 <= x < self.largura and 0 <= y < self.altura):
+            return None
+        col = 0
+        for run, code in self._row_runs(y):
+            col += run
+            if x < col:
+                return self.palette[code - 1] if code else None
+        return None
+
+    def read_row(self, y: int) -> List[Optional[str]]:
+        """Linha y inteira (None nas células vazias)"""
+        if not 0 <= y < self.altura:
+            raise ValueError(f"Linha fora do mapa: {y}")
+        row: List[Optional[str]] = []
+        for run, code in self._row_runs(y):
+            row.extend([self.palette[code - 1] if code else None] * run)
+        return row
+
+    def read_row_codes(self, y: int) -> List[int]:
+        """Linha y como índices da paleta (TileGrid.EMPTY nas vazias)"""
+        row: List[int] = []
+        for run, code in self._row_runs(y):
+            row.extend([code - 1 if code else TileGrid.EMPTY] * run)
+        return row
+
+    def to_tile_grid(self) -> TileGrid:
+        grid = TileGrid(self.largura, self.altura, palette=self.palette)
+        cells = grid.cells
+        for y in range(self.altura):
+            start = y * self.largura
+            cells[start:start + self.largura] = array("H", self.read_row_codes(y))
+        return grid
+
+    def to_mapa(self) -> MapaGerado:
+        """Decodifica o mapa completo"""
+        return MapaGerado(
+            id=self.id,
+            seed=self.seed,
+            setores=list(self.setores),
+            tiles=self.to_tile_grid(),
+            largura=self.largura,
+            altura=self.altura,
+            metadados=self.metadados
+        )
+
+    def to_dict(self) -> dict:
+        """Mesmo esquema de MapaGerado.to_dict"""
+        return self.to_mapa().to_dict()
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._buf = None
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "MapFileReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def decode_map(data: bytes) -> MapaGerado:
+    """Inverso de encode_map"""
+    return MapFileReader(data).to_mapa()
+
+def load_map(path: str) -> MapaGerado:
+    with MapFileReader(path) as reader:
+        return reader.to_mapa()
+
+def dict_to_map_bytes(data: dict) -> bytes:
+    """Converte do esquema to_dict para .ezmap"""
+    return encode_map(MapaGerado.from_dict(data))
@@ -0,0 +1,67 @@
+"""
+EZ STUDIOS - Greedy meshing do grid de tiles
+Junta retângulos de tiles iguais para emitir uma Part por retângulo
+"""
+
+from dataclasses import dataclass
+from typing import List
+from types import TileGrid
+
+@dataclass
+class TileRect:
+    """Retângulo de tiles iguais; (x, y) é o canto superior esquerdo"""
+    tile_id: str
+    x: int
+    y: int
+    largura: int
+    altura: int
+
+    @property
+    def area(self) -> int:
+        return self.largura * self.altura
+
+def greedy_mesh(grid: TileGrid) -> List[TileRect]:
+    """Cobre as células preenchidas com retângulos disjuntos de mesmo tile
+
+    Varre linha a linha: cada célula ainda livre abre um retângulo que
+    cresce para a direita enquanto o tile se repete e depois para baixo
+    enquanto a faixa inteira se repete. A saída segue a ordem de
+    varredura, então é determinística para o mesmo grid.
+    """
+    width, height = grid.largura, grid.altura
+    cells = grid.cells
+    empty = TileGrid.EMPTY
+    used = bytearray(width * height)
+    rects: List[TileRect] = []
+
+    for y in range(height):
+        row = y * width
+        x = 0
+        while x < width:
+            i = row + x
+            code = cells[i]
+            if code == empty or used[i]:
+                x += 1
+                continue
+
+            # Estender para a direita
+            w = 1
+            while x + w < width and cells[i + w] == code and not used[i + w]:
+                w += 1
+
+            # Estender para baixo enquanto a faixa [x, x+w) for toda igual e livre
+            h = 1
+            while y + h < height:
+                start = (y + h) * width + x
+                if any(cells[j] != code or used[j] for j in range(start, start + w)):
+                    break
+                h += 1
+
+            for dy in range(h):
+                start = (y + dy) * width + x
+                used[start:start + w] = b"\x01" * w
+
+            rects.append(TileRect(grid.palette[code], x, y, w, h))
+            x += w
+
+    return rects
@@ -0,0 +1,121 @@
+"""
+EZ STUDIOS - Profiler da geração de mapas
+Tempo por fase do pipeline + contadores do WFC, para métricas e logs
+"""
+
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Any, Iterator, Union
+
+# Fases medidas pelo IntentionCompiler, na ordem do pipeline. "cache" só
+# com cache ligado (inclui codificar/decodificar o layout); "wfcPropagacao"
+# só nos motores que propagam no próprio processo (não em chunked/sectors).
+# "serializacao" é medida pelos writers (JSON, .ezmap, RobloxAdapter) que
+# recebem o profiler, depois da geração: não entra em "total"
+PHASES = (
+    "config", "tiles", "cache", "bsp", "wfc", "wfcPasso", "wfcPropagacao", "extracao", "total",
+    "serializacao",
+)
+
+# Contadores que os motores WFC mantêm como atributos -> nome nas stats
+WFC_COUNTERS: Dict[str, str] = {
+    "propagation_pops": "popsPropagacao",
+    "domain_removals": "remocoesDominio",
+    "contradictions": "contradicoes",
+    "backtracks": "retrocessos",
+}
+
+class GenerationProfiler:
+    """Acumula tempos (por nome de fase) e contagens de uma geração
+
+    Fases do IntentionCompiler e dos writers em PHASES; wfcPasso inclui
+    a propagação feita dentro do passo. Para outro destino ou relógio, basta
+    uma subclasse (ex.: mandar cada fase para um tracer).
+    """
+
+    enabled = True
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.timings: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add_time(self, name: str, seconds: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Mede o bloco e soma no tempo da fase (também se o bloco falhar)"""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.add_time(name, self.clock() - start)
+
+    def _timed(self, method: Callable, name: str, counter: str) -> Callable:
+        clock = self.clock
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.add_time(name, clock() - start)
+                self.count(counter)
+        return wrapper
+
+    def instrument_wfc(self, grid: Any) -> None:
+        """Mede cada step/propagate_constraints do grid (só nesta instância)
+
+        Motores que delegam a um grid interno (overlapping) o expõem em
+        inner_grid; passos e propagação são medidos nele.
+        """
+        target = getattr(grid, "inner_grid", grid)
+        target.step = self._timed(target.step, "wfcPasso", "passosWfc")
+        if hasattr(target, "propagate_constraints"):
+            target.propagate_constraints = self._timed(
+                target.propagate_constraints, "wfcPropagacao", "propagacoes"
+            )
+
+    def collect_wfc(self, grid: Any) -> None:
+        """Copia os contadores que o motor expõe (motores em workers não expõem)"""
+        for attr, name in WFC_COUNTERS.items():
+            value = getattr(grid, attr, None)
+            if value is not None:
+                self.count(name, value)
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Stats planas: <fase>Ms em milissegundos + contagens"""
+        result: Dict[str, Union[int, float]] = {
+            f"{name}Ms": round(seconds * 1000, 3) for name, seconds in self.timings.items()
+        }
+        result.update(self.counts)
+        return result
+
+class NullProfiler(GenerationProfiler):
+    """Profiler desligado: não mede nem instrumenta nada"""
+
+    enabled = False
+
+    def add_time(self, name: str, seconds: float) -> None:
+        pass
+
+    def count(self, name: str, amount: int = 1) -> None:
+        pass
+
+    def phase(self, name: str):
+        return nullcontext()
+
+    def instrument_wfc(self, grid: Any) -> None:
+        pass
+
+    def collect_wfc(self, grid: Any) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        return {}
+
+NULL_PROFILER = NullProfiler()
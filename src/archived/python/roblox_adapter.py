@@ -3,45 +3,255 @@ EZ STUDIOS - Adaptador Roblox/Luau
 Converte MapaGerado em código Luau executável no Roblox Studio
 """
 
-from types import MapaGerado, Setor, TileInstance, BuildLimitExceeded
-from typing import Dict
+import os
+from dataclasses import dataclass
+from itertools import count, islice
+from types import MapaGerado, BuildLimitExceeded
+from typing import Dict, Iterator, List, TextIO, Tuple
+from xml.sax.saxutils import escape
+from meshing import greedy_mesh
+from profiler import GenerationProfiler, NULL_PROFILER
+
+# "inline": uma chamada CreateTile por tile; "packed": grid em linhas RLE + loop de decodificação
+EMISSION_MODES = {"inline", "packed"}
+
+# Tiles por batch entre as pausas task.wait do BuildMap
+BATCH_SIZE = 100
+
+# Linhas RLE por trecho emitido no modo packed
+PACKED_ROWS_PER_CHUNK = 64
+
+# Aparência dos tiles: mesma tabela para o script Luau e para o .rbxmx
+TILE_COLORS: Dict[str, Tuple[int, int, int]] = {
+    "chao_1": (120, 120, 120),
+    "parede_1": (60, 60, 60),
+    "porta_1": (139, 69, 19)
+}
+TILE_MATERIALS: Dict[str, str] = {
+    "chao_1": "SmoothPlastic",
+    "parede_1": "Concrete",
+    "porta_1": "Wood"
+}
+DEFAULT_COLOR: Tuple[int, int, int] = (255, 255, 255)
+DEFAULT_MATERIAL = "Plastic"
+
+# Paredes são mais altas que o piso (altura em studs)
+WALL_TILE = "parede_1"
+WALL_HEIGHT = 10
+FLOOR_HEIGHT = 1
+
+# Valores de Enum.Material usados no XML do .rbxmx
+MATERIAL_ENUM: Dict[str, int] = {
+    "Plastic": 256,
+    "SmoothPlastic": 272,
+    "Neon": 288,
+    "Wood": 512,
+    "WoodPlanks": 528,
+    "Marble": 784,
+    "Slate": 800,
+    "Concrete": 816,
+    "Granite": 832,
+    "Brick": 848,
+    "Pebble": 864,
+    "Cobblestone": 880,
+    "Metal": 1088,
+    "Grass": 1280,
+    "Sand": 1296,
+    "Fabric": 1312,
+    "Ice": 1536,
+    "Glass": 1568
+}
+
+# Material de Terrain por tile (Enum.Material); tiles fora da tabela viram DEFAULT_TERRAIN_MATERIAL
+TERRAIN_MATERIALS: Dict[str, str] = {
+    "chao_1": "Pavement",
+    "parede_1": "Concrete",
+    "porta_1": "WoodPlanks"
+}
+DEFAULT_TERRAIN_MATERIAL = "Ground"
+
+# Terrain tem resolução de 4 studs: o piso vira uma laje de 4 com o topo na altura do piso de Parts
+TERRAIN_FLOOR_THICKNESS = 4
+
+# Cores dos marcadores de setores especiais (as mesmas do MarkSpecialSectors)
+MARKER_COLORS: Dict[str, Tuple[int, int, int]] = {
+    "spawn": (0, 255, 0),
+    "boss": (255, 0, 0),
+    "loja": (0, 0, 255)
+}
+
+# Marcadores de setores especiais (mesmo código no script único e no módulo)
+MARK_SECTORS_LUAU = """-- Função para marcar setores especiais
+function MapBuilder.MarkSpecialSectors(mapFolder)
+    for _, setorData in ipairs(SETORES) do
+        if setorData.tipo == "spawn" or setorData.tipo == "boss" or setorData.tipo == "loja" then
+            local marker = Instance.new("Part")
+            marker.Name = setorData.tipo:upper() .. "_MARKER"
+            marker.Size = Vector3.new(2, 10, 2)
+            marker.Position = Vector3.new(
+                (setorData.x + setorData.largura/2) * BLOCK_SIZE,
+                5,
+                (setorData.y + setorData.altura/2) * BLOCK_SIZE
+            )
+            marker.Anchored = true
+            marker.CanCollide = false
+            marker.Transparency = 0.5
+
+            if setorData.tipo == "spawn" then
+                marker.Color = Color3.fromRGB(0, 255, 0)
+            elseif setorData.tipo == "boss" then
+                marker.Color = Color3.fromRGB(255, 0, 0)
+            elseif setorData.tipo == "loja" then
+                marker.Color = Color3.fromRGB(0, 0, 255)
+            end
+
+            marker.Parent = mapFolder
+        end
+    end
+end
+
+"""
+
+@dataclass
+class TerrainRegion:
+    """Bloco de Terrain para Terrain:FillBlock: centro e tamanho em studs, sem rotação"""
+    material: str
+    cx: float
+    cy: float
+    cz: float
+    sx: float
+    sy: float
+    sz: float
 
 class RobloxAdapter:
     """Adaptador para gerar código Luau a partir de mapas"""
 
-    def __init__(self, max_parts: int = 5000, block_size: int = 4):
+    def __init__(
+        self,
+        max_parts: int = 5000,
+        block_size: int = 4,
+        merge_tiles: bool = False,
+        emission: str = "inline"
+    ):
+        if emission not in EMISSION_MODES:
+            raise ValueError(
+                f"Modo de emissão desconhecido: {emission} (use {sorted(EMISSION_MODES)})"
+            )
+        if emission == "packed" and merge_tiles:
+            raise ValueError("Modo packed emite tile a tile; não combina com merge_tiles")
+
         self.max_parts = max_parts
         self.block_size = block_size
+        # Greedy meshing: retângulos de tiles iguais viram uma única Part escalada
+        self.merge_tiles = merge_tiles
+        self.emission = emission
 
-    def generate_luau_script(self, mapa: MapaGerado) -> str:
-        """Gera script Luau completo para construir o mapa"""
+    def count_parts(self, mapa: MapaGerado) -> int:
+        """Número de Parts que o script vai criar"""
+        if self.merge_tiles:
+            return len(greedy_mesh(mapa.tiles))
+        return len(mapa.tiles)
 
-        if len(mapa.tiles) > self.max_parts:
+    def check_limits(self, mapa: MapaGerado) -> None:
+        """Valida o limite de Parts antes de emitir qualquer coisa"""
+        if self.merge_tiles:
+            parts = self.count_parts(mapa)
+            if parts > self.max_parts:
+                raise BuildLimitExceeded(
+                    f"Mapa com {parts} Parts (após merge) excede limite de {self.max_parts}"
+                )
+        elif len(mapa.tiles) > self.max_parts:
             raise BuildLimitExceeded(
                 f"Mapa com {len(mapa.tiles)} tiles excede limite de {self.max_parts}"
             )
 
-        script = f"""-- EZ STUDIOS - Mapa Gerado Proceduralmente
+    def generate_luau_script(self, mapa: MapaGerado, profiler: GenerationProfiler = NULL_PROFILER) -> str:
+        """Gera script Luau completo para construir o mapa
+
+        Os exportadores aceitam um profiler e medem a fase "serializacao".
+        """
+        with profiler.phase("serializacao"):
+            self.check_limits(mapa)
+            return "".join(self.iter_luau_chunks(mapa))
+
+    def write_luau_script(
+        self,
+        mapa: MapaGerado,
+        out: TextIO,
+        profiler: GenerationProfiler = NULL_PROFILER
+    ) -> None:
+        """Escreve o script direto em out, um trecho por vez"""
+        with profiler.phase("serializacao"):
+            self.check_limits(mapa)
+            for chunk in self.iter_luau_chunks(mapa):
+                out.write(chunk)
+
+    def iter_luau_chunks(self, mapa: MapaGerado) -> Iterator[str]:
+        """Gera o script em trechos (cabeçalho, setores, um por batch, rodapé)
+
+        Cada trecho é montado uma vez; quem consome faz join ou escreve em
+        arquivo, então o custo é linear no número de tiles.
+        """
+        yield f"""-- EZ STUDIOS - Mapa Gerado Proceduralmente
 -- ID: {mapa.id}
 -- Seed: {mapa.seed}
 -- Dimensões: {mapa.largura}x{mapa.altura}
 -- Tiles: {len(mapa.tiles)}
 -- Setores: {len(mapa.setores)}
 
-local MapBuilder = {{}}
+"""
+        yield self._builder_definitions()
+
+        yield from self._iter_setores(mapa)
+
+        yield """-- Função para construir o mapa completo
+function MapBuilder.BuildMap(workspace)
+    local mapFolder = Instance.new("Folder")
+    mapFolder.Name = "GeneratedMap_""" + mapa.id + """"
+    mapFolder.Parent = workspace
+
+    print("Construindo mapa...")
+    local tilesBuilt = 0
+
+"""
+
+        if self.emission == "packed":
+            yield from self._iter_packed_build(mapa)
+        else:
+            yield from self._iter_inline_build(mapa)
+
+        yield """    
+    print("Mapa completo! Total de tiles: " .. tilesBuilt)
+    return mapFolder
+end
+
+""" + MARK_SECTORS_LUAU + """-- Executar construção
+local map = MapBuilder.BuildMap(workspace)
+MapBuilder.MarkSpecialSectors(map)
+
+return MapBuilder
+"""
+
+    def _builder_definitions(self) -> str:
+        """Configurações + funções de criação de tiles do MapBuilder"""
+        colors = ",\n".join(
+            f"    {tile_id} = Color3.fromRGB({r}, {g}, {b})"
+            for tile_id, (r, g, b) in TILE_COLORS.items()
+        )
+        materials = ",\n".join(
+            f"    {tile_id} = Enum.Material.{material}"
+            for tile_id, material in TILE_MATERIALS.items()
+        )
+        definitions = f"""local MapBuilder = {{}}
 
 -- Configurações
 local BLOCK_SIZE = {self.block_size}
 local TILE_COLORS = {{
-    chao_1 = Color3.fromRGB(120, 120, 120),
-    parede_1 = Color3.fromRGB(60, 60, 60),
-    porta_1 = Color3.fromRGB(139, 69, 19)
+{colors}
 }}
 
 local TILE_MATERIALS = {{
-    chao_1 = Enum.Material.SmoothPlastic,
-    parede_1 = Enum.Material.Concrete,
-    porta_1 = Enum.Material.Wood
+{materials}
 }}
 
 -- Função para criar um tile
@@ -55,22 +265,37 @@ function MapBuilder.CreateTile(parent, tileId, x, y)
     part.Material = TILE_MATERIALS[tileId] or Enum.Material.Plastic
 
     -- Paredes mais altas
-    if tileId == "parede_1" then
-        part.Size = Vector3.new(BLOCK_SIZE, 10, BLOCK_SIZE)
-        part.Position = Vector3.new(x * BLOCK_SIZE, 5, y * BLOCK_SIZE)
+    if tileId == "{WALL_TILE}" then
+        part.Size = Vector3.new(BLOCK_SIZE, {WALL_HEIGHT}, BLOCK_SIZE)
+        part.Position = Vector3.new(x * BLOCK_SIZE, {WALL_HEIGHT // 2}, y * BLOCK_SIZE)
     end
 
     part.Parent = parent
     return part
 end
 
--- Dados do mapa (setores)
-local SETORES = {{
 """
+        if self.merge_tiles:
+            definitions += """-- Função para criar um retângulo de tiles iguais numa só Part
+function MapBuilder.CreateTileRect(parent, tileId, x, y, w, h)
+    local part = MapBuilder.CreateTile(parent, tileId, x, y)
+    local cx = (x + (w - 1) / 2) * BLOCK_SIZE
+    local cz = (y + (h - 1) / 2) * BLOCK_SIZE
+    part.Size = Vector3.new(w * BLOCK_SIZE, part.Size.Y, h * BLOCK_SIZE)
+    part.Position = Vector3.new(cx, part.Position.Y, cz)
+    return part
+end
+
+"""
+        return definitions
 
-        # Adicionar setores
+    def _iter_setores(self, mapa: MapaGerado) -> Iterator[str]:
+        """Tabela SETORES com os dados dos setores"""
+        yield """-- Dados do mapa (setores)
+local SETORES = {
+"""
         for setor in mapa.setores:
-            script += f"""    {{
+            yield f"""    {{
         id = "{setor.id}",
         tipo = "{setor.tipo}",
         x = {setor.x},
@@ -79,84 +304,455 @@ local SETORES = {{
         altura = {setor.altura}
     }},
 """
+        yield """}
 
-        script += """}}
+"""
 
--- Função para construir o mapa completo
-function MapBuilder.BuildMap(workspace)
+    def _iter_inline_build(self, mapa: MapaGerado) -> Iterator[str]:
+        """Corpo de BuildMap com uma chamada por tile (ou por retângulo)"""
+        # Gerar tiles em batches, lendo o grid compacto sem criar objetos
+        if self.merge_tiles:
+            parts = iter(greedy_mesh(mapa.tiles))
+        else:
+            parts = mapa.tiles.iter_cells()
+        batch_number = 0
+        while True:
+            batch = list(islice(parts, BATCH_SIZE))
+            if not batch:
+                break
+            batch_number += 1
+            lines = [f"    -- Batch {batch_number}\n"]
+
+            if self.merge_tiles:
+                for rect in batch:
+                    lines.append(
+                        f'    MapBuilder.CreateTileRect(mapFolder, "{rect.tile_id}", '
+                        f'{rect.x}, {rect.y}, {rect.largura}, {rect.altura})\n'
+                    )
+                tiles_in_batch = sum(rect.area for rect in batch)
+            else:
+                for tile_id, x, y in batch:
+                    lines.append(f'    MapBuilder.CreateTile(mapFolder, "{tile_id}", {x}, {y})\n')
+                tiles_in_batch = len(batch)
+
+            lines.append(f"    tilesBuilt = tilesBuilt + {tiles_in_batch}\n")
+            lines.append('    print("Construído: " .. tilesBuilt .. " tiles")\n')
+            lines.append("    task.wait(0.1) -- Evitar lag\n\n")
+            yield "".join(lines)
+
+    def _iter_packed_build(self, mapa: MapaGerado) -> Iterator[str]:
+        """Corpo de BuildMap que decodifica o grid RLE (TileGrid.rle_rows) em tempo de execução
+
+        Cria as mesmas Parts, na mesma ordem e no mesmo ritmo de batches do
+        modo inline; só o código-fonte fica menor.
+        """
+        grid = mapa.tiles
+        palette = ", ".join(
+            f'{symbol} = "{tile_id}"'
+            for symbol, tile_id in zip(grid.RLE_SYMBOLS, grid.palette)
+        )
+        yield f"""    -- Grid compactado: por linha, [contagem]símbolo; "." = vazio
+    local PALETTE = {{{palette}}}
+    local ROWS = {{
+"""
+        rows = grid.rle_rows()
+        for i in range(0, len(rows), PACKED_ROWS_PER_CHUNK):
+            yield "".join(f'        "{row}",\n' for row in rows[i:i + PACKED_ROWS_PER_CHUNK])
+
+        yield f"""    }}
+
+    local pending = 0
+    for row, data in ipairs(ROWS) do
+        local y = row - 1
+        local x = 0
+        for count, symbol in string.gmatch(data, "(%d*)([%a%.])") do
+            local run = tonumber(count) or 1
+            local tileId = PALETTE[symbol]
+            if tileId then
+                for _ = 1, run do
+                    MapBuilder.CreateTile(mapFolder, tileId, x, y)
+                    x = x + 1
+                    pending = pending + 1
+                    if pending == {BATCH_SIZE} then
+                        tilesBuilt = tilesBuilt + pending
+                        pending = 0
+                        print("Construído: " .. tilesBuilt .. " tiles")
+                        task.wait(0.1) -- Evitar lag
+                    end
+                end
+            else
+                x = x + run
+            end
+        end
+    end
+    if pending > 0 then
+        tilesBuilt = tilesBuilt + pending
+        print("Construído: " .. tilesBuilt .. " tiles")
+        task.wait(0.1) -- Evitar lag
+    end
+
+"""
+
+    def generate_chunked_modules(
+        self,
+        mapa: MapaGerado,
+        chunk_size: int = 32,
+        frame_budget: float = 0.005,
+        profiler: GenerationProfiler = NULL_PROFILER
+    ) -> Dict[str, str]:
+        """Exporta o mapa em ModuleScripts por chunk espacial + MapBuilder + loader
+
+        As chaves são caminhos no formato do Rojo ("X.lua" = ModuleScript,
+        "X.server.lua" = Script). Cada chunk guarda suas linhas RLE em
+        MapChunks/; o BuildMap constrói até gastar frame_budget segundos
+        (medido com os.clock()) e só então cede um frame com task.wait().
+        """
+        with profiler.phase("serializacao"):
+            return self._chunked_modules(mapa, chunk_size, frame_budget)
+
+    def _chunked_modules(self, mapa: MapaGerado, chunk_size: int, frame_budget: float) -> Dict[str, str]:
+        if self.merge_tiles:
+            raise ValueError("Exportação em chunks emite tile a tile; não combina com merge_tiles")
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size precisa ser positivo: {chunk_size}")
+        self.check_limits(mapa)
+
+        grid = mapa.tiles
+        modules: Dict[str, str] = {}
+        chunk_names = []
+        for y0 in range(0, mapa.altura, chunk_size):
+            for x0 in range(0, mapa.largura, chunk_size):
+                chunk = grid.crop(x0, y0, chunk_size, chunk_size)
+                if len(chunk) == 0:
+                    continue
+                name = f"Chunk_{x0 // chunk_size}_{y0 // chunk_size}"
+                chunk_names.append(name)
+                rows = "".join(f'        "{row}",\n' for row in chunk.rle_rows())
+                modules[f"MapChunks/{name}.lua"] = (
+                    f"-- {name}: {len(chunk)} tiles a partir de ({x0}, {y0})\n"
+                    f"return {{\n    x = {x0},\n    y = {y0},\n    rows = {{\n{rows}    }},\n}}\n"
+                )
+
+        palette = ", ".join(
+            f'{symbol} = "{tile_id}"'
+            for symbol, tile_id in zip(grid.RLE_SYMBOLS, grid.palette)
+        )
+        chunk_list = "".join(f'    "{name}",\n' for name in chunk_names)
+        builder = [
+            f"""-- EZ STUDIOS - Mapa Gerado Proceduralmente (módulos por chunk)
+-- ID: {mapa.id}
+-- Seed: {mapa.seed}
+-- Dimensões: {mapa.largura}x{mapa.altura}
+-- Tiles: {len(mapa.tiles)}
+-- Setores: {len(mapa.setores)}
+-- Chunks: {len(chunk_names)} de {chunk_size}x{chunk_size}
+
+""",
+            self._builder_definitions(),
+            *self._iter_setores(mapa),
+            f"""-- Grid compactado por chunk: por linha, [contagem]símbolo; "." = vazio
+local PALETTE = {{{palette}}}
+local CHUNKS = {{
+{chunk_list}}}
+
+-- Segundos de construção por frame antes de ceder
+local FRAME_BUDGET = {frame_budget}
+
+-- Função para construir o mapa completo a partir dos módulos de chunk
+function MapBuilder.BuildMap(workspace, chunkFolder)
     local mapFolder = Instance.new("Folder")
-    mapFolder.Name = "GeneratedMap_""" + mapa.id + """"
+    mapFolder.Name = "GeneratedMap_{mapa.id}"
     mapFolder.Parent = workspace
 
     print("Construindo mapa...")
     local tilesBuilt = 0
+    local frameStart = os.clock()
+
+    for _, chunkName in ipairs(CHUNKS) do
+        local chunk = require(chunkFolder:WaitForChild(chunkName))
+        for row, data in ipairs(chunk.rows) do
+            local y = chunk.y + row - 1
+            local x = chunk.x
+            for count, symbol in string.gmatch(data, "(%d*)([%a%.])") do
+                local run = tonumber(count) or 1
+                local tileId = PALETTE[symbol]
+                if tileId then
+                    for _ = 1, run do
+                        MapBuilder.CreateTile(mapFolder, tileId, x, y)
+                        x = x + 1
+                        tilesBuilt = tilesBuilt + 1
+                        -- Orçamento do frame esgotado: cede só até o próximo frame
+                        if os.clock() - frameStart >= FRAME_BUDGET then
+                            task.wait()
+                            frameStart = os.clock()
+                        end
+                    end
+                else
+                    x = x + run
+                end
+            end
+        end
+        print("Construído: " .. tilesBuilt .. " tiles (" .. chunkName .. ")")
+    end
+
+    print("Mapa completo! Total de tiles: " .. tilesBuilt)
+    return mapFolder
+end
+
+""",
+            MARK_SECTORS_LUAU,
+            "return MapBuilder\n"
+        ]
+        modules["MapBuilder.lua"] = "".join(builder)
+        modules["BuildMap.server.lua"] = """-- EZ STUDIOS - Loader: constrói o mapa a partir dos módulos de chunk
+local MapBuilder = require(script.Parent.MapBuilder)
 
+local map = MapBuilder.BuildMap(workspace, script.Parent.MapChunks)
+MapBuilder.MarkSpecialSectors(map)
 """
+        return modules
 
-        # Gerar tiles em batches
-        batch_size = 100
-        for i in range(0, len(mapa.tiles), batch_size):
-            batch = mapa.tiles[i:i+batch_size]
-            script += f"    -- Batch {i//batch_size + 1}
-"
+    def terrain_regions(self, mapa: MapaGerado) -> List[TerrainRegion]:
+        """Retângulos de tiles iguais (greedy meshing) como blocos de Terrain
 
-            for tile in batch:
-                script += f'    MapBuilder.CreateTile(mapFolder, "{tile.tile_id}", {tile.x}, {tile.y})
-'
+        Paredes ocupam a mesma caixa que a Part de parede; os demais tiles
+        viram uma laje de TERRAIN_FLOOR_THICKNESS cujo topo coincide com o
+        topo do piso de Parts.
+        """
+        block = self.block_size
+        floor_top = FLOOR_HEIGHT / 2
+        regions = []
+        for rect in greedy_mesh(mapa.tiles):
+            if rect.tile_id == WALL_TILE:
+                cy, sy = WALL_HEIGHT // 2, WALL_HEIGHT
+            else:
+                cy, sy = floor_top - TERRAIN_FLOOR_THICKNESS / 2, TERRAIN_FLOOR_THICKNESS
+            regions.append(TerrainRegion(
+                material=TERRAIN_MATERIALS.get(rect.tile_id, DEFAULT_TERRAIN_MATERIAL),
+                cx=(rect.x + (rect.largura - 1) / 2) * block,
+                cy=cy,
+                cz=(rect.y + (rect.altura - 1) / 2) * block,
+                sx=rect.largura * block,
+                sy=sy,
+                sz=rect.altura * block
+            ))
+        return regions
 
-            script += f"    tilesBuilt = tilesBuilt + {len(batch)}
-"
-            script += f'    print("Construído: " .. tilesBuilt .. " tiles")
-'
-            script += "    task.wait(0.1) -- Evitar lag
+    def generate_terrain_script(
+        self,
+        mapa: MapaGerado,
+        frame_budget: float = 0.005,
+        profiler: GenerationProfiler = NULL_PROFILER
+    ) -> str:
+        """Script Luau que preenche o Terrain com FillBlock em vez de criar Parts
 
-"
+        Os blocos vão numa tabela de dados e um loop chama Terrain:FillBlock
+        em lote, cedendo um frame quando o orçamento (os.clock()) acaba.
+        Terrain não conta Parts, então max_parts não se aplica.
+        """
+        with profiler.phase("serializacao"):
+            return self._terrain_script(mapa, frame_budget)
 
-        script += """    
-    print("Mapa completo! Total de tiles: " .. tilesBuilt)
-    return mapFolder
-end
+    def _terrain_script(self, mapa: MapaGerado, frame_budget: float) -> str:
+        def num(value: float) -> str:
+            value = float(value)
+            return str(int(value)) if value.is_integer() else repr(value)
 
--- Função para marcar setores especiais
-function MapBuilder.MarkSpecialSectors(mapFolder)
-    for _, setorData in ipairs(SETORES) do
-        if setorData.tipo == "spawn" or setorData.tipo == "boss" or setorData.tipo == "loja" then
-            local marker = Instance.new("Part")
-            marker.Name = setorData.tipo:upper() .. "_MARKER"
-            marker.Size = Vector3.new(2, 10, 2)
-            marker.Position = Vector3.new(
-                (setorData.x + setorData.largura/2) * BLOCK_SIZE,
-                5,
-                (setorData.y + setorData.altura/2) * BLOCK_SIZE
-            )
-            marker.Anchored = true
-            marker.CanCollide = false
-            marker.Transparency = 0.5
+        regions = self.terrain_regions(mapa)
+        materials = sorted({r.material for r in regions})
+        material_index = {material: i + 1 for i, material in enumerate(materials)}
+        material_list = ", ".join(f"Enum.Material.{m}" for m in materials)
+        region_lines = "".join(
+            f"    {{{material_index[r.material]}, {num(r.cx)}, {num(r.cy)}, {num(r.cz)}, "
+            f"{num(r.sx)}, {num(r.sy)}, {num(r.sz)}}},\n"
+            for r in regions
+        )
 
-            if setorData.tipo == "spawn" then
-                marker.Color = Color3.fromRGB(0, 255, 0)
-            elseif setorData.tipo == "boss" then
-                marker.Color = Color3.fromRGB(255, 0, 0)
-            elseif setorData.tipo == "loja" then
-                marker.Color = Color3.fromRGB(0, 0, 255)
-            end
+        return f"""-- EZ STUDIOS - Mapa Gerado Proceduralmente (Terrain)
+-- ID: {mapa.id}
+-- Seed: {mapa.seed}
+-- Dimensões: {mapa.largura}x{mapa.altura}
+-- Tiles: {len(mapa.tiles)}
+-- Blocos de Terrain: {len(regions)}
 
-            marker.Parent = mapFolder
+local Terrain = workspace.Terrain
+
+local MATERIALS = {{{material_list}}}
+
+-- {{material, cx, cy, cz, sx, sy, sz}} em studs
+local REGIONS = {{
+{region_lines}}}
+
+-- Segundos de preenchimento por frame antes de ceder
+local FRAME_BUDGET = {frame_budget}
+
+local function FillMap()
+    print("Preenchendo Terrain...")
+    local frameStart = os.clock()
+    for _, region in ipairs(REGIONS) do
+        Terrain:FillBlock(
+            CFrame.new(region[2], region[3], region[4]),
+            Vector3.new(region[5], region[6], region[7]),
+            MATERIALS[region[1]]
+        )
+        if os.clock() - frameStart >= FRAME_BUDGET then
+            task.wait()
+            frameStart = os.clock()
         end
     end
+    print("Terrain completo! Blocos: " .. #REGIONS)
 end
 
--- Executar construção
-local map = MapBuilder.BuildMap(workspace)
-MapBuilder.MarkSpecialSectors(map)
-
-return MapBuilder
+FillMap()
 """
 
-        return script
+    def save_terrain_script(
+        self,
+        mapa: MapaGerado,
+        filename: str,
+        profiler: GenerationProfiler = NULL_PROFILER,
+        **options
+    ) -> None:
+        """Salva o script de Terrain em arquivo"""
+        with profiler.phase("serializacao"):
+            script = self.generate_terrain_script(mapa, **options)
+            with open(filename, 'w', encoding='utf-8') as f:
+                f.write(script)
+
+    def save_chunked_modules(
+        self,
+        mapa: MapaGerado,
+        directory: str,
+        profiler: GenerationProfiler = NULL_PROFILER,
+        **options
+    ) -> None:
+        """Grava os arquivos de generate_chunked_modules em directory (árvore do Rojo)"""
+        with profiler.phase("serializacao"):
+            modules = self.generate_chunked_modules(mapa, **options)
+            for path, source in modules.items():
+                full_path = os.path.join(directory, *path.split("/"))
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                with open(full_path, 'w', encoding='utf-8') as f:
+                    f.write(source)
+
+    def write_rbxmx(self, mapa: MapaGerado, out: TextIO, profiler: GenerationProfiler = NULL_PROFILER) -> None:
+        """Escreve um modelo .rbxmx (Folder + Parts + marcadores de setor) direto em out
+
+        O Studio insere o modelo pronto, sem criar instâncias em tempo de
+        execução. Cada Part é escrita assim que montada, então a memória não
+        cresce com o mapa. Respeita block_size e merge_tiles.
+        """
+        with profiler.phase("serializacao"):
+            self._write_rbxmx(mapa, out)
+
+    def _write_rbxmx(self, mapa: MapaGerado, out: TextIO) -> None:
+        self.check_limits(mapa)
+        block = self.block_size
+        referents = count()
+
+        out.write(
+            '<roblox xmlns:xmime="http://www.w3.org/2005/05/xmlmime" '
+            'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+            'xsi:noNamespaceSchemaLocation="http://www.roblox.com/roblox.xsd" version="4">\n'
+        )
+        out.write(
+            f'  <Item class="Folder" referent="RBX{next(referents)}">\n'
+            f'    <Properties>\n'
+            f'      <string name="Name">{escape("GeneratedMap_" + mapa.id)}</string>\n'
+            f'    </Properties>\n'
+        )
+
+        if self.merge_tiles:
+            parts = ((r.tile_id, r.x, r.y, r.largura, r.altura) for r in greedy_mesh(mapa.tiles))
+        else:
+            parts = ((tile_id, x, y, 1, 1) for tile_id, x, y in mapa.tiles.iter_cells())
+
+        for tile_id, x, y, w, h in parts:
+            if tile_id == WALL_TILE:
+                height, center_y = WALL_HEIGHT, WALL_HEIGHT // 2
+            else:
+                height, center_y = FLOOR_HEIGHT, 0
+            out.write(self._rbxmx_part(
+                next(referents),
+                name=f"{tile_id}_{x}_{y}",
+                position=((x + (w - 1) / 2) * block, center_y, (y + (h - 1) / 2) * block),
+                size=(w * block, height, h * block),
+                color=TILE_COLORS.get(tile_id, DEFAULT_COLOR),
+                material=TILE_MATERIALS.get(tile_id, DEFAULT_MATERIAL)
+            ))
+
+        for setor in mapa.setores:
+            if setor.tipo not in MARKER_COLORS:
+                continue
+            out.write(self._rbxmx_part(
+                next(referents),
+                name=f"{setor.tipo.upper()}_MARKER",
+                position=(
+                    (setor.x + setor.largura / 2) * block, 5,
+                    (setor.y + setor.altura / 2) * block
+                ),
+                size=(2, 10, 2),
+                color=MARKER_COLORS[setor.tipo],
+                material=DEFAULT_MATERIAL,
+                can_collide=False,
+                transparency=0.5
+            ))
+
+        out.write("  </Item>\n</roblox>\n")
+
+    @staticmethod
+    def _rbxmx_part(
+        referent: int,
+        name: str,
+        position: Tuple[float, float, float],
+        size: Tuple[float, float, float],
+        color: Tuple[int, int, int],
+        material: str,
+        can_collide: bool = True,
+        transparency: float = 0.0
+    ) -> str:
+        """XML de uma Part ancorada, sem rotação"""
+        def num(value: float) -> str:
+            value = float(value)
+            return str(int(value)) if value.is_integer() else repr(value)
+
+        px, py, pz = (num(v) for v in position)
+        sx, sy, sz = (num(v) for v in size)
+        r, g, b = color
+        return (
+            f'    <Item class="Part" referent="RBX{referent}">\n'
+            f'      <Properties>\n'
+            f'        <string name="Name">{escape(name)}</string>\n'
+            f'        <bool name="Anchored">true</bool>\n'
+            f'        <bool name="CanCollide">{"true" if can_collide else "false"}</bool>\n'
+            f'        <CoordinateFrame name="CFrame"><X>{px}</X><Y>{py}</Y><Z>{pz}</Z>'
+            f'<R00>1</R00><R01>0</R01><R02>0</R02><R10>0</R10><R11>1</R11><R12>0</R12>'
+            f'<R20>0</R20><R21>0</R21><R22>1</R22></CoordinateFrame>\n'
+            f'        <Color3uint8 name="Color3uint8">{0xFF000000 | (r << 16) | (g << 8) | b}</Color3uint8>\n'
+            f'        <token name="Material">{MATERIAL_ENUM[material]}</token>\n'
+            f'        <Vector3 name="size"><X>{sx}</X><Y>{sy}</Y><Z>{sz}</Z></Vector3>\n'
+            f'        <float name="Transparency">{num(transparency)}</float>\n'
+            f'      </Properties>\n'
+            f'    </Item>\n'
+        )
+
+    def save_rbxmx(self, mapa: MapaGerado, filename: str, profiler: GenerationProfiler = NULL_PROFILER) -> None:
+        """Salva o modelo .rbxmx em arquivo"""
+        with profiler.phase("serializacao"):
+            self.check_limits(mapa)
+            with open(filename, 'w', encoding='utf-8') as f:
+                self.write_rbxmx(mapa, f)
 
-    def save_script_to_file(self, mapa: MapaGerado, filename: str) -> None:
-        """Salva script Luau em arquivo"""
-        script = self.generate_luau_script(mapa)
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(script)
+    def save_script_to_file(
+        self,
+        mapa: MapaGerado,
+        filename: str,
+        profiler: GenerationProfiler = NULL_PROFILER
+    ) -> None:
+        """Salva script Luau em arquivo sem montar a string inteira"""
+        with profiler.phase("serializacao"):
+            # Validar antes de abrir: estourar o limite não deixa arquivo pela metade
+            self.check_limits(mapa)
+            with open(filename, 'w', encoding='utf-8') as f:
+                for chunk in self.iter_luau_chunks(mapa):
+                    f.write(chunk)
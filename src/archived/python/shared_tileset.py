@@ -0,0 +1,225 @@
+"""
+EZ STUDIOS - Tileset compilado em memória compartilhada
+Workers anexam as tabelas pelo nome do segmento, sem pickle do tileset nem recompilação
+"""
+
+import json
+import secrets
+import struct
+import threading
+from multiprocessing import shared_memory
+from typing import List, Tuple, Dict, Any, Optional
+from types import Tile
+from tileset import CompiledTileset, DIRECTIONS, cached_tileset, register_tileset
+
+MAGIC = b"EZTS"
+VERSION = 1
+# magic, versão, n tiles, bytes por linha de bits, total de índices compat, bytes do JSON
+HEADER = struct.Struct("<4sHxxIIII")
+
+# Segmento publicado por fingerprint neste processo (ver SharedTileset)
+_published: Dict[str, "_Segment"] = {}
+_published_lock = threading.Lock()
+
+def segment_name(fingerprint: str) -> str:
+    """Nome único por publicação (curto: o limite do macOS é 31 caracteres)
+
+    O sufixo aleatório evita que dois processos publicando o mesmo tileset
+    dividam um segmento que o primeiro a terminar removeria.
+    """
+    return f"ezts_{fingerprint[:12]}_{secrets.token_hex(4)}"
+
+def _layout(n: int, row_bytes: int, compat_total: int, json_len: int) -> Dict[str, Tuple[int, int]]:
+    """(offset, tamanho) de cada seção; seções numéricas alinhadas em 8 bytes"""
+    sections = [
+        ("weights", 8 * n),
+        ("wlogw", 8 * n),
+        ("compat_offsets", 4 * (len(DIRECTIONS) * n + 1)),
+        ("compat_indices", 4 * compat_total),
+        ("allowed", len(DIRECTIONS) * n * row_bytes),
+        ("compat_masks", len(DIRECTIONS) * n * row_bytes),
+        ("tiles", json_len),
+    ]
+    layout = {}
+    offset = HEADER.size
+    for name, size in sections:
+        offset = (offset + 7) & ~7
+        layout[name] = (offset, size)
+        offset += size
+    layout["total"] = (0, offset)
+    return layout
+
+def _write_masks(buf: memoryview, offset: int, rows: List[List[int]], row_bytes: int) -> None:
+    for d, row in enumerate(rows):
+        for a, mask in enumerate(row):
+            start = offset + (d * len(row) + a) * row_bytes
+            buf[start:start + row_bytes] = mask.to_bytes(row_bytes, "little")
+
+def _read_masks(buf: memoryview, offset: int, n: int, row_bytes: int) -> List[List[int]]:
+    return [
+        [
+            int.from_bytes(buf[offset + (d * n + a) * row_bytes:offset + (d * n + a + 1) * row_bytes], "little")
+            for a in range(n)
+        ]
+        for d in range(len(DIRECTIONS))
+    ]
+
+class _Segment:
+    """Segmento com as tabelas de um tileset, criado por este processo"""
+
+    def __init__(self, tileset: CompiledTileset):
+        n = len(tileset.tile_ids)
+        row_bytes = (n + 7) // 8
+        offsets = [0]
+        for row in tileset.compat:
+            for indices in row:
+                offsets.append(offsets[-1] + len(indices))
+        tiles_json = json.dumps([t.to_dict() for t in tileset]).encode("utf-8")
+        layout = _layout(n, row_bytes, offsets[-1], len(tiles_json))
+
+        while True:
+            try:
+                self.shm = shared_memory.SharedMemory(
+                    name=segment_name(tileset.fingerprint), create=True, size=layout["total"][1]
+                )
+                break
+            except FileExistsError:
+                continue
+        self.name = self.shm.name
+        self.publishers = 0
+
+        buf = self.shm.buf
+        HEADER.pack_into(buf, 0, MAGIC, VERSION, n, row_bytes, offsets[-1], len(tiles_json))
+        # Ordem nativa: os workers leem com memoryview.cast, na mesma máquina
+        struct.pack_into(f"{n}d", buf, layout["weights"][0], *tileset.weights)
+        struct.pack_into(f"{n}d", buf, layout["wlogw"][0], *tileset.wlogw)
+        struct.pack_into(f"{len(offsets)}i", buf, layout["compat_offsets"][0], *offsets)
+        indices = [b for row in tileset.compat for bs in row for b in bs]
+        struct.pack_into(f"{len(indices)}i", buf, layout["compat_indices"][0], *indices)
+        _write_masks(buf, layout["allowed"][0], tileset.allowed, row_bytes)
+        _write_masks(buf, layout["compat_masks"][0], tileset.compat_masks, row_bytes)
+        start = layout["tiles"][0]
+        buf[start:start + len(tiles_json)] = tiles_json
+
+    def release(self) -> None:
+        self.shm.close()
+        self.shm.unlink()
+
+class SharedTileset:
+    """Publicação de um tileset; o segmento sai quando a última publicação do processo fecha
+
+    Publicações do mesmo fingerprint no mesmo processo (ex.: threads de um
+    lote) dividem um segmento com contagem de referências; outro processo
+    cria o seu próprio. Enquanto houver publicação aberta, o CompiledTileset
+    vai para os workers só como fingerprint + nome do segmento (ver
+    CompiledTileset.__reduce__); o objeto compilado não é alterado.
+    """
+
+    def __init__(self, tileset: CompiledTileset):
+        self.tileset = tileset
+        self.fingerprint = tileset.fingerprint
+        with _published_lock:
+            segment = _published.get(self.fingerprint)
+            if segment is None:
+                segment = _published[self.fingerprint] = _Segment(tileset)
+            segment.publishers += 1
+        self.segment = segment
+        self.name = segment.name
+        self.closed = False
+
+    def close(self) -> None:
+        """Encerra a publicação (e remove o segmento, se era a última)"""
+        with _published_lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.segment.publishers -= 1
+            if self.segment.publishers:
+                return
+            del _published[self.fingerprint]
+        self.segment.release()
+
+    def __enter__(self) -> "SharedTileset":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def publish_tileset(tileset: CompiledTileset) -> SharedTileset:
+    """Publica as tabelas do tileset; use como context manager em volta do pool"""
+    return SharedTileset(tileset)
+
+def published_name(fingerprint: str) -> Optional[str]:
+    """Segmento publicado por este processo para o fingerprint, se houver"""
+    with _published_lock:
+        segment = _published.get(fingerprint)
+        return segment.name if segment is not None else None
+
+class _AttachedSegment(shared_memory.SharedMemory):
+    """Segmento anexado: as memoryviews do tileset apontam para ele até o fim do processo"""
+
+    def __del__(self):
+        # close() falharia com as views ainda exportadas; o mapeamento cai junto com elas
+        pass
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    try:
+        return _AttachedSegment(name=name, track=False)
+    except TypeError:
+        # Antes do 3.13 não há track=False; os workers usam o resource_tracker
+        # herdado de quem publicou, e o registro repetido do nome é inofensivo
+        return _AttachedSegment(name=name)
+
+def attach_tileset(fingerprint: str, name: str) -> CompiledTileset:
+    """CompiledTileset do processo para o fingerprint, anexando ao segmento se preciso
+
+    Pesos e listas de compatibilidade são memoryviews sobre o segmento
+    (sem cópia); só as máscaras inteiras são remontadas a partir dos bits.
+    Com o start method "fork" (padrão no Linux) os workers herdam o memo de
+    tilesets compilados e nem leem o segmento; ele é usado com "spawn" e
+    "forkserver" (padrão no macOS/Windows e no Linux a partir do 3.14).
+    """
+    tileset = cached_tileset(fingerprint)
+    if tileset is not None:
+        return tileset
+
+    shm = _attach(name)
+    buf = shm.buf
+    magic, version, n, row_bytes, compat_total, json_len = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Segmento de tileset inválido: {shm.name}")
+    layout = _layout(n, row_bytes, compat_total, json_len)
+
+    def section(name: str, fmt: str) -> memoryview:
+        offset, size = layout[name]
+        return buf[offset:offset + size].cast(fmt)
+
+    offsets = section("compat_offsets", "i")
+    indices = section("compat_indices", "i")
+    compat = [
+        [indices[offsets[d * n + a]:offsets[d * n + a + 1]] for a in range(n)]
+        for d in range(len(DIRECTIONS))
+    ]
+    start = layout["tiles"][0]
+    tiles = [_tile_from_dict(data) for data in json.loads(bytes(buf[start:start + json_len]))]
+
+    tables: Dict[str, Any] = {
+        "weights": section("weights", "d"),
+        "wlogw": section("wlogw", "d"),
+        "allowed": _read_masks(buf, layout["allowed"][0], n, row_bytes),
+        "compat_masks": _read_masks(buf, layout["compat_masks"][0], n, row_bytes),
+        "compat": compat,
+    }
+    tileset = CompiledTileset(tiles, fingerprint, tables=tables)
+    # As memoryviews dependem do segmento: ele fica aberto enquanto o tileset existir
+    tileset.shared_memory = shm
+    return register_tileset(tileset)
+
+def _tile_from_dict(data: dict) -> Tile:
+    return Tile(
+        id=data["id"],
+        tipo=data["tipo"],
+        tags=data["tags"],
+        conexoes_permitidas=data["conexoesPermitidas"],
+        peso=data["peso"]
+    )
@@ -0,0 +1,164 @@
+"""
+EZ STUDIOS - Testes do IntentionCompiler (escolha de motor, profiler)
+"""
+
+from typing import List, Optional, Union
+import pytest
+from types import Intencao, Tile
+from cache import MapCache
+from compiler import IntentionCompiler, WFC_ENGINES, NUMPY_AUTO_THRESHOLD
+from profiler import GenerationProfiler, PHASES
+from tileset import CompiledTileset
+from wfc_bitset import BitsetWFCGrid
+
+class NumpyLikeGrid(BitsetWFCGrid):
+    """Mesma assinatura do NumpyWFCGrid, para testar a escolha sem NumPy instalado"""
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        tiles: Union[List[Tile], CompiledTileset],
+        seed: Optional[str] = None,
+        batch_radius: int = 2
+    ):
+        super().__init__(width, height, tiles, seed)
+
+def make_intent(largura: int, altura: int) -> Intencao:
+    return Intencao(
+        id="intencao_teste",
+        categoria="Mapa",
+        descricao_natural="dungeon de teste",
+        parametros={"largura": largura, "altura": altura, "quantidadeAreas": 3}
+    )
+
+def test_auto_engine_keeps_bitset_options_above_numpy_threshold(monkeypatch):
+    if "numpy" not in WFC_ENGINES:
+        monkeypatch.setitem(WFC_ENGINES, "numpy", NumpyLikeGrid)
+    side = 130
+    assert side * side >= NUMPY_AUTO_THRESHOLD
+    intencao = make_intent(side, side)
+
+    plain = IntentionCompiler()
+    assert plain.select_wfc_engine(plain.map_intention_to_config(intencao)) == "numpy"
+
+    for options in ({"propagator": "ac4"}, {"backtrack_budget": 20}):
+        compiler = IntentionCompiler(wfc_options=options)
+        config = compiler.map_intention_to_config(intencao)
+        assert compiler.select_wfc_engine(config) == "bitset"
+        mapa = compiler.generate_from_intention(intencao, seed="auto")
+        assert len(mapa.tiles) == side * side
+        assert compiler.logs[-1].build_status == "success"
+
+def profiled_phases(mapa) -> set:
+    return {key[:-2] for key in mapa.metadados["stats"] if key.endswith("Ms")}
+
+def test_profiler_reports_the_phases_an_uncached_generation_runs():
+    intencao = make_intent(30, 20)
+    logs = []
+    compiler = IntentionCompiler("bitset", profiler=GenerationProfiler, on_stats=logs.append)
+    mapa = compiler.generate_from_intention(intencao, seed="perfil")
+
+    assert profiled_phases(mapa) == {
+        "config", "tiles", "bsp", "wfc", "wfcPasso", "wfcPropagacao", "extracao", "total"
+    }
+    stats = mapa.metadados["stats"]
+    # O último passo só descobre que não há mais células
+    assert stats["passosWfc"] == stats["propagacoes"] + 1 == 30 * 20 + 1
+    assert logs == [compiler.logs[-1]]
+    assert logs[0].map_stats["totalMs"] == stats["totalMs"]
+
+class StatsFailOnceProfiler(GenerationProfiler):
+    """Falha na primeira leitura das stats, depois do total já medido"""
+
+    instances: List["StatsFailOnceProfiler"] = []
+
+    def __init__(self):
+        super().__init__()
+        self.failed = False
+        self.total_records = 0
+        StatsFailOnceProfiler.instances.append(self)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        self.total_records += name == "total"
+        super().add_time(name, seconds)
+
+    def stats(self):
+        if not self.failed:
+            self.failed = True
+            raise RuntimeError("stats indisponíveis")
+        return super().stats()
+
+def test_error_after_total_records_total_once():
+    logs = []
+    compiler = IntentionCompiler("bitset", profiler=StatsFailOnceProfiler, on_stats=logs.append)
+    with pytest.raises(RuntimeError):
+        compiler.generate_from_intention(make_intent(12, 12), seed="falha")
+
+    profiler = StatsFailOnceProfiler.instances[-1]
+    assert profiler.total_records == 1
+    assert logs[0].build_status == "error"
+    assert logs[0].map_stats["totalMs"] == round(profiler.timings["total"] * 1000, 3)
+
+def test_profiler_times_cache_codec_under_the_cache_phase():
+    intencao = make_intent(30, 20)
+    compiler = IntentionCompiler("bitset", cache=MapCache(), profiler=GenerationProfiler)
+    miss = compiler.generate_from_intention(intencao, seed="perfil")
+    hit = compiler.generate_from_intention(intencao, seed="perfil")
+
+    assert "cache" in profiled_phases(miss) and "bsp" in profiled_phases(miss)
+    assert profiled_phases(hit) == {"config", "tiles", "cache", "total"}
+    assert profiled_phases(miss) | profiled_phases(hit) <= set(PHASES)
+
+def test_profiler_measures_propagation_of_the_overlapping_engine():
+    example = IntentionCompiler("bitset").generate_from_intention(make_intent(24, 24), seed="exemplo")
+    compiler = IntentionCompiler(
+        "overlapping",
+        wfc_options={"example": example, "backtrack_budget": 50},
+        profiler=GenerationProfiler
+    )
+    mapa = compiler.generate_from_intention(make_intent(12, 12), seed="perfil")
+    assert {"wfcPasso", "wfcPropagacao"} <= profiled_phases(mapa)
+    stats = mapa.metadados["stats"]
+    assert stats["passosWfc"] == stats["propagacoes"] + 1
+
+def test_cache_hit_returns_an_identical_map():
+    intencao = make_intent(30, 20)
+    cache = MapCache()
+    compiler = IntentionCompiler("bitset", cache=cache)
+    first = compiler.generate_from_intention(intencao, seed="cache")
+    second = compiler.generate_from_intention(intencao, seed="cache")
+
+    assert cache.stats()["hits"] == 1
+    assert [log.map_stats["cacheHit"] for log in compiler.logs] == [0, 1]
+    assert second.setores == first.setores
+    assert second.tiles.palette == first.tiles.palette
+    assert second.tiles.cells == first.tiles.cells
+
+def test_disk_cache_hit_survives_a_new_cache_instance(tmp_path):
+    intencao = make_intent(30, 20)
+    first = IntentionCompiler("bitset", cache=MapCache(disk_dir=str(tmp_path))).generate_from_intention(
+        intencao, seed="disco"
+    )
+    cache = MapCache(disk_dir=str(tmp_path))
+    second = IntentionCompiler("bitset", cache=cache).generate_from_intention(intencao, seed="disco")
+
+    assert cache.stats()["diskHits"] == 1
+    assert second.setores == first.setores
+    assert second.tiles.cells == first.tiles.cells
+
+def test_cache_key_is_stable_and_tracks_wfc_options():
+    intencao = make_intent(30, 20)
+
+    def key(compiler: IntentionCompiler, seed: str = "cache") -> str:
+        config = compiler.map_intention_to_config(intencao)
+        return MapCache.make_key(
+            compiler.cache_config(config), seed, compiler.compiled_tileset().fingerprint
+        )
+
+    base = key(IntentionCompiler("bitset", wfc_options={"propagator": "ac4"}))
+    assert base == key(IntentionCompiler("bitset", wfc_options={"propagator": "ac4"}))
+    assert base != key(IntentionCompiler("bitset", wfc_options={"propagator": "collapsed"}))
+    assert base != key(IntentionCompiler("bitset", wfc_options={"propagator": "ac4", "backtrack_budget": 5}))
+    assert base != key(IntentionCompiler("set"))
+    assert base != key(IntentionCompiler("bitset", wfc_options={"propagator": "ac4"}), seed="outra")
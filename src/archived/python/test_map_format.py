@@ -0,0 +1,112 @@
+"""
+EZ STUDIOS - Testes dos formatos de mapa (TileGrid, JSON v1/compacto/v2, .ezmap)
+"""
+
+from array import array
+from itertools import count
+import io
+import json
+import pytest
+from types import MapaGerado, Setor, TileGrid, TileInstance
+from map_format import MapFileReader, encode_map, decode_map, save_map, load_map
+from profiler import GenerationProfiler
+
+PALETTE = ["parede_1", "chao_1", "porta_1"]
+E = TileGrid.EMPTY
+# 5x3 com duas células vazias (EMPTY), uma delas no meio de uma linha
+CELLS = [
+    0, 0, 2, 0, 0,
+    0, 1, E, 1, 0,
+    0, 0, 0, 0, E,
+]
+
+def make_map() -> MapaGerado:
+    grid = TileGrid(5, 3, PALETTE, array("H", CELLS))
+    return MapaGerado(
+        id="mapa_teste",
+        seed="seed",
+        setores=[Setor("s0", 0, 0, 5, 3, "spawn")],
+        tiles=grid,
+        largura=5,
+        altura=3,
+        metadados={"stats": {"numTiles": len(grid), "densidade": 13 / 15}}
+    )
+
+def assert_same_map(result: MapaGerado, expected: MapaGerado) -> None:
+    assert (result.id, result.seed, result.largura, result.altura) == (
+        expected.id, expected.seed, expected.largura, expected.altura
+    )
+    assert result.setores == expected.setores
+    assert result.metadados == expected.metadados
+    assert result.tiles == expected.tiles
+    # Células vazias continuam vazias (não viram tile nem somem do grid)
+    assert [result.tiles.get_tile_at(x, y) for y in range(3) for x in range(5)] == [
+        expected.tiles.get_tile_at(x, y) for y in range(3) for x in range(5)
+    ]
+
+def test_tile_grid_behaves_like_the_old_tile_list_without_indexing():
+    grid = make_map().tiles
+    instances = list(grid)
+    assert len(grid) == len(instances) == 13
+    assert instances[2] == TileInstance(tile_id="porta_1", x=2, y=0)
+    assert grid == instances
+    assert grid.get_tile_at(2, 1) is None
+    # Indexar seria O(n) por acesso: falha alto em vez de ficar quadrático
+    with pytest.raises(TypeError):
+        grid[0]
+
+@pytest.mark.parametrize("indent", [2, None])
+def test_write_json_round_trips(indent):
+    mapa = make_map()
+    buffer = io.StringIO()
+    mapa.write_json(buffer, indent=indent)
+    text = buffer.getvalue()
+
+    if indent is None:
+        assert text == json.dumps(mapa.to_dict(), separators=(",", ":"))
+    else:
+        assert text == json.dumps(mapa.to_dict(), indent=2) == mapa.to_json()
+    assert_same_map(MapaGerado.from_dict(json.loads(text)), mapa)
+
+def test_ezmap_round_trips_through_bytes_and_files(tmp_path):
+    mapa = make_map()
+    decoded = decode_map(encode_map(mapa))
+    assert_same_map(decoded, mapa)
+    assert decoded.tiles.palette == PALETTE
+    assert decoded.tiles.cells == mapa.tiles.cells
+
+    path = str(tmp_path / "mapa.ezmap")
+    save_map(mapa, path)
+    assert_same_map(load_map(path), mapa)
+    with MapFileReader(path) as reader:
+        assert reader.get_tile_at(2, 0) == "porta_1"
+        assert reader.get_tile_at(2, 1) is None
+        assert reader.read_row(2) == ["parede_1"] * 4 + [None]
+
+def test_v2_json_round_trips_with_rle_rows():
+    mapa = make_map()
+    data = json.loads(mapa.to_json_v2())
+    assert data["versao"] == 2
+    assert data["palette"] == PALETTE
+    assert data["rows"] == ["2AC2A", "AB.BA", "4A."]
+
+    decoded = MapaGerado.from_dict(data)
+    assert_same_map(decoded, mapa)
+    assert decoded.tiles.cells == mapa.tiles.cells
+
+def test_writers_time_serialization_once_per_call(tmp_path):
+    mapa = make_map()
+    # Relógio que avança 1 por leitura: cada fase medida soma exatamente 1
+    ticks = count()
+    profiler = GenerationProfiler(clock=lambda: next(ticks))
+
+    assert mapa.to_json(profiler=profiler) == mapa.to_json()
+    assert mapa.to_json_v2(profiler) == mapa.to_json_v2()
+    buffer = io.StringIO()
+    mapa.write_json(buffer, indent=None, profiler=profiler)
+    assert json.loads(buffer.getvalue()) == mapa.to_dict()
+    assert encode_map(mapa, profiler) == encode_map(mapa)
+    save_map(mapa, str(tmp_path / "mapa.ezmap"), profiler)
+
+    assert profiler.timings == {"serializacao": 5}
+    assert profiler.stats()["serializacaoMs"] == 5000
@@ -0,0 +1,132 @@
+"""
+EZ STUDIOS - Testes do RobloxAdapter (exportação para Terrain)
+"""
+
+import io
+import re
+from array import array
+from itertools import count
+from types import MapaGerado, Setor, TileGrid, TileInstance
+from profiler import GenerationProfiler
+from roblox_adapter import (
+    RobloxAdapter, TERRAIN_MATERIALS, TERRAIN_FLOOR_THICKNESS, WALL_HEIGHT
+)
+
+# Sala 6x4 com paredes na borda, porta no meio da parede de baixo e uma célula vazia
+LAYOUT = [
+    "PPPPPP",
+    "PCCCCP",
+    "PCCC.P",
+    "PPDPPP",
+]
+TILE_IDS = {"P": "parede_1", "C": "chao_1", "D": "porta_1"}
+
+def make_map() -> MapaGerado:
+    tiles = [
+        TileInstance(tile_id=TILE_IDS[char], x=x, y=y)
+        for y, row in enumerate(LAYOUT)
+        for x, char in enumerate(row)
+        if char in TILE_IDS
+    ]
+    return MapaGerado(
+        id="teste",
+        seed="seed",
+        setores=[Setor("s0", 0, 0, 6, 4, "spawn")],
+        tiles=tiles,
+        largura=6,
+        altura=4
+    )
+
+def voxel_materials(regions, block_size: int, y: float):
+    """Amostra o centro de cada tile na altura y: {(x, z): material} dos blocos que o contêm"""
+    samples = {}
+    for region in regions:
+        x0 = region.cx - region.sx / 2
+        z0 = region.cz - region.sz / 2
+        if not region.cy - region.sy / 2 <= y <= region.cy + region.sy / 2:
+            continue
+        for tx in range(round(x0 / block_size + 0.5), round((x0 + region.sx) / block_size + 0.5)):
+            for tz in range(round(z0 / block_size + 0.5), round((z0 + region.sz) / block_size + 0.5)):
+                assert (tx, tz) not in samples, f"blocos sobrepostos em ({tx}, {tz})"
+                samples[(tx, tz)] = region.material
+    return samples
+
+def test_terrain_regions_cover_each_tile_once_with_its_material():
+    mapa = make_map()
+    for block_size in (4, 3):
+        regions = RobloxAdapter(block_size=block_size).terrain_regions(mapa)
+        # Amostra logo abaixo do topo do piso: pega lajes de piso e paredes
+        samples = voxel_materials(regions, block_size, 0.0)
+        expected = {
+            (x, y): TERRAIN_MATERIALS[tile_id] for tile_id, x, y in mapa.tiles.iter_cells()
+        }
+        assert samples == expected
+
+def test_terrain_regions_merge_rectangles_and_keep_heights():
+    regions = RobloxAdapter(block_size=4).terrain_regions(make_map())
+    # Greedy meshing: bem menos blocos que tiles
+    assert len(regions) < len(make_map().tiles) // 2
+
+    walls = [r for r in regions if r.material == TERRAIN_MATERIALS["parede_1"]]
+    floors = [r for r in regions if r.material != TERRAIN_MATERIALS["parede_1"]]
+    assert all(r.sy == WALL_HEIGHT and r.cy == WALL_HEIGHT // 2 for r in walls)
+    # Laje do piso com topo em 0.5 (topo da Part de piso)
+    assert all(r.sy == TERRAIN_FLOOR_THICKNESS for r in floors)
+    assert all(r.cy + r.sy / 2 == 0.5 for r in floors)
+
+    # Acima do piso só sobram paredes
+    above = voxel_materials(regions, 4, 3.0)
+    assert set(above.values()) == {TERRAIN_MATERIALS["parede_1"]}
+    assert len(above) == sum(row.count("P") for row in LAYOUT)
+
+def test_terrain_script_emits_one_fillblock_entry_per_region():
+    adapter = RobloxAdapter(block_size=4)
+    mapa = make_map()
+    regions = adapter.terrain_regions(mapa)
+    script = adapter.generate_terrain_script(mapa)
+
+    materials = re.search(r"local MATERIALS = \{(.*)\}", script).group(1)
+    materials = [m.strip().replace("Enum.Material.", "") for m in materials.split(",")]
+    entries = re.findall(r"^    \{(\d+), ([^}]*)\},$", script, re.M)
+    assert len(entries) == len(regions)
+
+    for (index, numbers), region in zip(entries, regions):
+        assert materials[int(index) - 1] == region.material
+        values = [float(v) for v in numbers.split(", ")]
+        assert values == [region.cx, region.cy, region.cz, region.sx, region.sy, region.sz]
+
+    assert "Terrain:FillBlock(" in script
+    assert "Instance.new(\"Part\")" not in script
+
+def test_terrain_export_ignores_part_limit():
+    # Terrain não cria Parts: mapas acima de max_parts continuam exportáveis
+    grid = TileGrid(200, 200, ["chao_1"], array("H", [0]) * (200 * 200))
+    mapa = MapaGerado("grande", "s", [], grid, 200, 200)
+    regions = RobloxAdapter(max_parts=10).terrain_regions(mapa)
+    assert len(regions) == 1
+    assert (regions[0].sx, regions[0].sz) == (800, 800)
+
+def test_exporters_time_serialization_once_per_call(tmp_path):
+    mapa = make_map()
+    adapter = RobloxAdapter()
+    # Relógio que avança 1 por leitura: cada fase medida soma exatamente 1
+    ticks = count()
+    profiler = GenerationProfiler(clock=lambda: next(ticks))
+
+    assert adapter.generate_luau_script(mapa, profiler) == adapter.generate_luau_script(mapa)
+    out = io.StringIO()
+    adapter.write_luau_script(mapa, out, profiler)
+    adapter.save_script_to_file(mapa, str(tmp_path / "mapa.lua"), profiler)
+    assert out.getvalue() == (tmp_path / "mapa.lua").read_text(encoding="utf-8")
+
+    assert adapter.generate_terrain_script(mapa, profiler=profiler) == adapter.generate_terrain_script(mapa)
+    adapter.save_terrain_script(mapa, str(tmp_path / "terrain.lua"), profiler, frame_budget=0.01)
+    assert adapter.generate_chunked_modules(mapa, 4, profiler=profiler) == adapter.generate_chunked_modules(mapa, 4)
+    adapter.save_chunked_modules(mapa, str(tmp_path / "rojo"), profiler, chunk_size=4)
+
+    rbxmx = io.StringIO()
+    adapter.write_rbxmx(mapa, rbxmx, profiler)
+    adapter.save_rbxmx(mapa, str(tmp_path / "mapa.rbxmx"), profiler)
+    assert rbxmx.getvalue() == (tmp_path / "mapa.rbxmx").read_text(encoding="utf-8")
+
+    assert profiler.timings == {"serializacao": 9}
@@ -0,0 +1,109 @@
+"""
+EZ STUDIOS - Testes do tileset compilado, da memória compartilhada e dos padrões do overlapping
+"""
+
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from types import TileGrid
+from compiler import IntentionCompiler
+from shared_tileset import publish_tileset, published_name
+from tileset import iter_bits
+import wfc_overlapping
+from wfc_overlapping import extract_patterns
+
+def test_iter_bits_lists_set_bits_in_ascending_order():
+    assert iter_bits(0) == []
+    assert iter_bits(0b101101) == [0, 2, 3, 5]
+    # Máscaras largas como as do modelo overlapping (milhares de padrões)
+    bits = [3, 64, 999, 2382]
+    assert iter_bits(sum(1 << b for b in bits)) == bits
+
+def naive_patterns(grid: TileGrid, n: int, periodic: bool) -> dict:
+    """Contagem de padrões NxN direto pelas tuplas, sem hash"""
+    width, height = grid.largura, grid.altura
+    span_x = width if periodic else width - n + 1
+    span_y = height if periodic else height - n + 1
+    counts = {}
+    for y in range(span_y):
+        for x in range(span_x):
+            pattern = tuple(
+                grid.cells[((y + dy) % height) * width + (x + dx) % width]
+                for dy in range(n)
+                for dx in range(n)
+            )
+            counts[pattern] = counts.get(pattern, 0) + 1
+    return counts
+
+def sample_grid() -> TileGrid:
+    grid = TileGrid(9, 7, ["parede_1", "chao_1", "porta_1"])
+    for i in range(len(grid.cells)):
+        grid.cells[i] = (i * 7 + i // 9) % 4 % 3 if i % 11 else TileGrid.EMPTY
+    return grid
+
+@pytest.mark.parametrize("periodic", [False, True])
+@pytest.mark.parametrize("n", [2, 3])
+def test_extract_patterns_matches_a_naive_count(n, periodic):
+    grid = sample_grid()
+    index = extract_patterns(grid, n, periodic)
+    assert dict(zip(index.patterns, index.counts)) == naive_patterns(grid, n, periodic)
+    assert len(set(index.patterns)) == len(index.patterns)
+
+def test_extract_patterns_survives_hash_collisions(monkeypatch):
+    # Módulo minúsculo: quase todo hash colide, só a comparação separa os padrões
+    monkeypatch.setattr(wfc_overlapping, "HASH_MOD", 5)
+    grid = sample_grid()
+    for periodic in (False, True):
+        index = extract_patterns(grid, 3, periodic)
+        assert dict(zip(index.patterns, index.counts)) == naive_patterns(grid, 3, periodic)
+
+def attached_tables(tileset):
+    """Roda no worker: tabelas do tileset recebido e se vieram do segmento"""
+    return (
+        tileset.tile_ids,
+        list(tileset.weights),
+        [[list(indices) for indices in row] for row in tileset.compat],
+        tileset.compat_masks,
+        tileset.shared_memory is not None
+    )
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="segmentos POSIX só visíveis em /dev/shm")
+def test_publications_share_one_segment_until_the_last_closes():
+    tileset = IntentionCompiler().compiled_tileset()
+    first = publish_tileset(tileset)
+    second = publish_tileset(tileset)
+    assert first.name == second.name == published_name(tileset.fingerprint)
+
+    first.close()
+    first.close()
+    # A outra publicação continua valendo para os workers dela
+    assert published_name(tileset.fingerprint) == second.name
+    assert os.path.exists(f"/dev/shm/{second.name}")
+
+    second.close()
+    assert published_name(tileset.fingerprint) is None
+    assert not os.path.exists(f"/dev/shm/{second.name}")
+
+def test_publishing_does_not_change_the_compiled_tileset():
+    tileset = IntentionCompiler().compiled_tileset()
+    plain = pickle.dumps(tileset)
+    with publish_tileset(tileset) as shared:
+        # Publicado: vai só o fingerprint + nome do segmento
+        assert shared.name.encode("ascii") in pickle.dumps(tileset)
+        assert len(pickle.dumps(tileset)) < len(plain)
+        assert tileset.shared_memory is None
+    assert pickle.dumps(tileset) == plain
+
+def test_spawned_workers_attach_to_the_published_segment():
+    # "fork" herdaria o memo de tilesets; "spawn" força a leitura do segmento
+    tileset = IntentionCompiler().compiled_tileset()
+    context = multiprocessing.get_context("spawn")
+    with publish_tileset(tileset), ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        tile_ids, weights, compat, compat_masks, attached = pool.submit(attached_tables, tileset).result()
+    assert attached
+    assert tile_ids == tileset.tile_ids
+    assert weights == tileset.weights
+    assert compat == tileset.compat
+    assert compat_masks == tileset.compat_masks
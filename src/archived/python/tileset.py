@@ -0,0 +1,209 @@
+"""
+EZ STUDIOS - Tileset compilado para os motores WFC
+Valida o tileset uma vez e pré-calcula índices, pesos e compatibilidades
+"""
+
+import math
+import threading
+from collections import OrderedDict
+from typing import List, Tuple, Dict, FrozenSet, Iterator, Union, Iterable, Optional, Any
+from types import Tile
+from cache import tileset_fingerprint
+
+# Ordem e deslocamentos idênticos a WFCGrid.get_neighbors
+DIRECTIONS: Tuple[str, ...] = ("norte", "sul", "leste", "oeste")
+OFFSETS: Tuple[Tuple[int, int], ...] = ((0, -1), (0, 1), (1, 0), (-1, 0))
+OPPOSITE: Tuple[int, ...] = (1, 0, 3, 2)
+
+# Tilesets compilados por fingerprint (por processo; cada worker compila uma vez)
+MAX_COMPILED = 32
+_compiled: "OrderedDict[str, CompiledTileset]" = OrderedDict()
+_compiled_lock = threading.Lock()
+
+def weight_log_weight(weight: float) -> float:
+    """Termo w * log2(w) usado nas somas incrementais de entropia"""
+    return weight * math.log2(weight) if weight > 0 else 0.0
+
+def iter_bits(mask: int) -> List[int]:
+    """Índices dos bits ligados em ordem crescente
+
+    Isola o bit mais baixo a cada volta: custa O(bits ligados), não O(largura
+    da máscara) (importa com os milhares de padrões do modelo overlapping).
+    """
+    bits = []
+    while mask:
+        low = mask & -mask
+        bits.append(low.bit_length() - 1)
+        mask ^= low
+    return bits
+
+def validate_tiles(tiles: List[Tile]) -> None:
+    """Erros de tileset que corromperiam o índice denso ou as regras"""
+    if not tiles:
+        raise ValueError("Tileset vazio")
+    seen = set()
+    for tile in tiles:
+        if tile.id in seen:
+            raise ValueError(f"Tile duplicado no tileset: {tile.id}")
+        seen.add(tile.id)
+        if not tile.peso >= 0:
+            raise ValueError(f"Peso inválido para {tile.id}: {tile.peso}")
+        for direction in tile.conexoes_permitidas:
+            if direction not in DIRECTIONS:
+                raise ValueError(f"Direção desconhecida em {tile.id}: {direction}")
+    if not any(tile.peso > 0 for tile in tiles):
+        raise ValueError("Tileset sem nenhum tile de peso positivo")
+
+class CompiledTileset:
+    """Tabelas imutáveis de um tileset, compartilhadas por todos os motores
+
+    Índice denso: bit/posição i <-> tile_ids[i], na ordem do tileset.
+    allowed[d][a]: máscara da regra de a na direção d (tiles ausentes da
+    regra ou desconhecidos ficam de fora; direção sem regra aceita tudo).
+    compat_masks[d][a]: allowed simetrizado, b ao lado de a na direção d só
+    se a regra de b na direção oposta também aceitar a.
+    Itera como a lista de Tile original, então serve onde se espera tiles.
+    `tables` recebe tabelas já prontas (ex.: anexadas da memória compartilhada).
+    """
+
+    def __init__(
+        self,
+        tiles: Iterable[Tile],
+        fingerprint: str = "",
+        tables: Optional[Dict[str, Any]] = None
+    ):
+        tiles = list(tiles)
+        validate_tiles(tiles)
+        self.tile_list: List[Tile] = tiles
+        self.fingerprint = fingerprint or tileset_fingerprint(tiles)
+        # Segmento de onde vieram as tabelas (tileset anexado num worker)
+        self.shared_memory: Optional[Any] = None
+
+        self.tiles: Dict[str, Tile] = {t.id: t for t in tiles}
+        self.tile_ids: List[str] = [t.id for t in tiles]
+        self.tile_index: Dict[str, int] = {tid: i for i, tid in enumerate(self.tile_ids)}
+        self.full_mask = (1 << len(tiles)) - 1
+
+        if tables is None:
+            self.weights = [t.peso for t in tiles]
+            self.wlogw = [weight_log_weight(w) for w in self.weights]
+            self.allowed: List[List[int]] = self._compile_allowed()
+            self.compat_masks: List[List[int]] = self._compile_compat()
+            # compat[d][a]: índices de compat_masks[d][a] (laços do AC-4)
+            self.compat = [[iter_bits(mask) for mask in row] for row in self.compat_masks]
+        else:
+            self.weights = tables["weights"]
+            self.wlogw = tables["wlogw"]
+            self.allowed = tables["allowed"]
+            self.compat_masks = tables["compat_masks"]
+            self.compat = tables["compat"]
+
+        self.tile_weights: Dict[str, float] = dict(zip(self.tile_ids, self.weights))
+        self.tile_wlogw: Dict[str, float] = dict(zip(self.tile_ids, self.wlogw))
+        self._allowed_sets: Optional[Dict[str, Dict[str, FrozenSet[str]]]] = None
+        # União de allowed por domínio, memoizada entre grids do mesmo tileset
+        self.allowed_cache: List[Dict[int, int]] = [{} for _ in DIRECTIONS]
+
+    @property
+    def allowed_sets(self) -> Dict[str, Dict[str, FrozenSet[str]]]:
+        """allowed_sets[direção][tile_id]: mesma regra de allowed, em IDs (só o WFCGrid usa)"""
+        if self._allowed_sets is None:
+            self._allowed_sets = {
+                direction: {
+                    tid: frozenset(self.tile_ids[b] for b in iter_bits(self.allowed[d][a]))
+                    for a, tid in enumerate(self.tile_ids)
+                }
+                for d, direction in enumerate(DIRECTIONS)
+            }
+        return self._allowed_sets
+
+    def _compile_allowed(self) -> List[List[int]]:
+        table = []
+        for direction in DIRECTIONS:
+            row = []
+            for tile in self.tile_list:
+                conexoes = tile.conexoes_permitidas
+                if direction not in conexoes:
+                    row.append(self.full_mask)
+                    continue
+                mask = 0
+                for other in conexoes[direction]:
+                    if other in self.tile_index:
+                        mask |= 1 << self.tile_index[other]
+                row.append(mask)
+            table.append(row)
+        return table
+
+    def _compile_compat(self) -> List[List[int]]:
+        table = []
+        for d in range(len(DIRECTIONS)):
+            back = self.allowed[OPPOSITE[d]]
+            row = []
+            for a in range(len(self.tile_ids)):
+                mask = 0
+                for b in iter_bits(self.allowed[d][a]):
+                    if back[b] >> a & 1:
+                        mask |= 1 << b
+                row.append(mask)
+            table.append(row)
+        return table
+
+    def compat_matrix(self, direction: int) -> List[List[bool]]:
+        """Matriz n x n de compat_masks[direction] (linha a, coluna b)"""
+        n = len(self.tile_ids)
+        return [[bool(mask >> b & 1) for b in range(n)] for mask in self.compat_masks[direction]]
+
+    def allowed_mask(self, direction: int, mask: int) -> int:
+        """Máscara permitida na direção para qualquer tile do domínio"""
+        cache = self.allowed_cache[direction]
+        result = cache.get(mask)
+        if result is None:
+            row = self.allowed[direction]
+            result = 0
+            for i in iter_bits(mask):
+                result |= row[i]
+            cache[mask] = result
+        return result
+
+    def __iter__(self) -> Iterator[Tile]:
+        return iter(self.tile_list)
+
+    def __len__(self) -> int:
+        return len(self.tile_list)
+
+    def __reduce__(self):
+        # Publicado por este processo: o worker anexa ao segmento. Senão vão
+        # os Tiles e compile_tileset reaproveita o memo do processo
+        from shared_tileset import attach_tileset, published_name
+        name = published_name(self.fingerprint)
+        if name is not None:
+            return (attach_tileset, (self.fingerprint, name))
+        return (compile_tileset, (self.tile_list,))
+
+def cached_tileset(fingerprint: str) -> Optional[CompiledTileset]:
+    """Tileset já compilado neste processo, se houver"""
+    with _compiled_lock:
+        compiled = _compiled.get(fingerprint)
+        if compiled is not None:
+            _compiled.move_to_end(fingerprint)
+        return compiled
+
+def register_tileset(compiled: CompiledTileset) -> CompiledTileset:
+    """Guarda no memo do processo; se outro thread chegou antes, vale o dele"""
+    with _compiled_lock:
+        compiled = _compiled.setdefault(compiled.fingerprint, compiled)
+        _compiled.move_to_end(compiled.fingerprint)
+        while len(_compiled) > MAX_COMPILED:
+            _compiled.popitem(last=False)
+    return compiled
+
+def compile_tileset(tiles: Union[CompiledTileset, Iterable[Tile]]) -> CompiledTileset:
+    """Tileset compilado, memoizado pelo fingerprint (já compilado volta como está)"""
+    if isinstance(tiles, CompiledTileset):
+        return tiles
+    tiles = list(tiles)
+    fingerprint = tileset_fingerprint(tiles)
+    compiled = cached_tileset(fingerprint)
+    if compiled is not None:
+        return compiled
+    return register_tileset(CompiledTileset(tiles, fingerprint))
@@ -3,10 +3,14 @@ EZ STUDIOS - Core Type Definitions
 Protocolo Entropia Zero: Contratos explícitos
 """
 
-from typing import List, Dict, Any, Optional, Literal
+from typing import List, Dict, Any, Optional, Literal, Iterable, Iterator, Tuple, Union, TextIO
 from dataclasses import dataclass, field
 from datetime import datetime
+from array import array
+import io
 import json
+import sys
+from profiler import GenerationProfiler, NULL_PROFILER
 
 @dataclass
 class Tile:
@@ -48,6 +52,18 @@ class Setor:
             "tipo": self.tipo
         }
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "Setor":
+        bounds = data["bounds"]
+        return cls(
+            id=data["id"],
+            x=bounds["x"],
+            y=bounds["y"],
+            largura=bounds["largura"],
+            altura=bounds["altura"],
+            tipo=data.get("tipo", "generico")
+        )
+
 @dataclass
 class TileInstance:
     """Instância de um tile em uma posição específica"""
@@ -62,17 +78,187 @@ class TileInstance:
             "y": self.y
         }
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "TileInstance":
+        return cls(tile_id=data["tileId"], x=data["x"], y=data["y"])
+
+class TileGrid:
+    """Tiles do mapa em paleta de IDs + grid plano array('H'), linha a linha
+
+    Guarda 2 bytes por célula; objetos TileInstance só são criados ao iterar.
+    Células vazias usam EMPTY. Sem indexação por posição na lista de tiles
+    (seria O(n) por acesso): use iter_cells() ou get_tile_at().
+    """
+
+    EMPTY = 0xFFFF
+    # Símbolos de tile nas linhas RLE (rle_rows), na ordem da paleta
+    RLE_SYMBOLS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+    def __init__(
+        self,
+        largura: int,
+        altura: int,
+        palette: Optional[List[str]] = None,
+        cells: Optional[array] = None
+    ):
+        self.largura = largura
+        self.altura = altura
+        self.palette: List[str] = list(palette or [])
+        self._palette_index: Dict[str, int] = {tid: i for i, tid in enumerate(self.palette)}
+        if cells is None:
+            cells = array("H", [self.EMPTY]) * (largura * altura)
+        elif len(cells) != largura * altura:
+            raise ValueError(f"Grid com {len(cells)} células para mapa {largura}x{altura}")
+        self.cells = cells
+
+    @classmethod
+    def from_instances(cls, largura: int, altura: int, tiles: Iterable[TileInstance]) -> "TileGrid":
+        """Converte uma lista de TileInstance (a última por posição prevalece)"""
+        grid = cls(largura, altura)
+        for tile in tiles:
+            grid.set_tile(tile.x, tile.y, tile.tile_id)
+        return grid
+
+    def palette_code(self, tile_id: str) -> int:
+        """Índice do tile na paleta, incluindo-o se for novo"""
+        code = self._palette_index.get(tile_id)
+        if code is None:
+            code = len(self.palette)
+            if code >= self.EMPTY:
+                raise ValueError("Paleta excede 65535 tiles distintos")
+            self.palette.append(tile_id)
+            self._palette_index[tile_id] = code
+        return code
+
+    def set_tile(self, x: int, y: int, tile_id: str) -> None:
+        if not (0 <= x < self.largura and 0 <= y < self.altura):
+            raise ValueError(f"Tile fora do mapa: ({x}, {y})")
+        self.cells[y * self.largura + x] = self.palette_code(tile_id)
+
+    def get_tile_at(self, x: int, y: int) -> Optional[str]:
+        if 0 <= x < self.largura and 0 <= y < self.altura:
+            code = self.cells[y * self.largura + x]
+            if code != self.EMPTY:
+                return self.palette[code]
+        return None
+
+    def iter_cells(self) -> Iterator[Tuple[str, int, int]]:
+        """(tile_id, x, y) das células preenchidas, sem criar objetos"""
+        palette = self.palette
+        width = self.largura
+        empty = self.EMPTY
+        for i, code in enumerate(self.cells):
+            if code != empty:
+                yield palette[code], i % width, i // width
+
+    def to_bytes(self) -> bytes:
+        """Células em uint16 little-endian"""
+        cells = self.cells
+        if sys.byteorder != "little":
+            cells = array("H", cells)
+            cells.byteswap()
+        return cells.tobytes()
+
+    @classmethod
+    def from_bytes(cls, largura: int, altura: int, palette: List[str], data: bytes) -> "TileGrid":
+        """Inverso de to_bytes"""
+        cells = array("H")
+        cells.frombytes(data)
+        if sys.byteorder != "little":
+            cells.byteswap()
+        return cls(largura, altura, palette, cells)
+
+    def crop(self, x: int, y: int, largura: int, altura: int) -> "TileGrid":
+        """Sub-grid retangular com a mesma paleta (recortado nas bordas do mapa)"""
+        largura = max(0, min(largura, self.largura - x))
+        altura = max(0, min(altura, self.altura - y))
+        cells = array("H")
+        for row in range(y, y + altura):
+            start = row * self.largura + x
+            cells.extend(self.cells[start:start + largura])
+        return TileGrid(largura, altura, self.palette, cells)
+
+    def rle_rows(self) -> List[str]:
+        """Uma string RLE por linha: [contagem]símbolo, com contagem omitida quando 1
+
+        O símbolo do tile é RLE_SYMBOLS[índice na paleta]; "." marca célula vazia.
+        Ex.: "3AB2." = 3x paleta[0], 1x paleta[1], 2 vazias.
+        """
+        if len(self.palette) > len(self.RLE_SYMBOLS):
+            raise ValueError(f"Paleta com mais de {len(self.RLE_SYMBOLS)} tiles não cabe no RLE")
+        symbols = self.RLE_SYMBOLS
+        cells = self.cells
+        width = self.largura
+        rows = []
+        for y in range(self.altura):
+            parts = []
+            start = y * width
+            x = 0
+            while x < width:
+                code = cells[start + x]
+                run = 1
+                while x + run < width and cells[start + x + run] == code:
+                    run += 1
+                symbol = "." if code == self.EMPTY else symbols[code]
+                parts.append(symbol if run == 1 else f"{run}{symbol}")
+                x += run
+            rows.append("".join(parts))
+        return rows
+
+    @classmethod
+    def from_rle_rows(cls, largura: int, altura: int, palette: List[str], rows: List[str]) -> "TileGrid":
+        """Inverso de rle_rows"""
+        if len(rows) != altura:
+            raise ValueError(f"RLE com {len(rows)} linhas para mapa de altura {altura}")
+        codes = {symbol: i for i, symbol in enumerate(cls.RLE_SYMBOLS[:len(palette)])}
+        codes["."] = cls.EMPTY
+        cells = array("H")
+        for y, row in enumerate(rows):
+            count = ""
+            for char in row:
+                if char.isdigit():
+                    count += char
+                    continue
+                if char not in codes:
+                    raise ValueError(f"Símbolo RLE inválido na linha {y}: {char!r}")
+                cells.extend([codes[char]] * (int(count) if count else 1))
+                count = ""
+            if len(cells) != (y + 1) * largura:
+                raise ValueError(f"Linha RLE {y} não tem {largura} células")
+        return cls(largura, altura, palette, cells)
+
+    def __iter__(self) -> Iterator[TileInstance]:
+        for tile_id, x, y in self.iter_cells():
+            yield TileInstance(tile_id=tile_id, x=x, y=y)
+
+    def __len__(self) -> int:
+        return len(self.cells) - self.cells.count(self.EMPTY)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, TileGrid):
+            return (
+                self.largura == other.largura and self.altura == other.altura
+                and list(self.iter_cells()) == list(other.iter_cells())
+            )
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
 @dataclass
 class MapaGerado:
     """Mapa completo gerado pelo sistema"""
     id: str
     seed: str
     setores: List[Setor]
-    tiles: List[TileInstance]
+    tiles: TileGrid  # aceita List[TileInstance], convertida em __post_init__
     largura: int
     altura: int
     metadados: Dict[str, Any] = field(default_factory=dict)
 
+    def __post_init__(self):
+        if not isinstance(self.tiles, TileGrid):
+            self.tiles = TileGrid.from_instances(self.largura, self.altura, self.tiles)
+
     def to_dict(self) -> dict:
         return {
             "id": self.id,
@@ -84,8 +270,110 @@ class MapaGerado:
             "metadados": self.metadados
         }
 
-    def to_json(self) -> str:
-        return json.dumps(self.to_dict(), indent=2)
+    def to_dict_v2(self) -> dict:
+        """Esquema compacto v2: paleta + uma string RLE por linha (ver TileGrid.rle_rows)"""
+        return {
+            "versao": 2,
+            "id": self.id,
+            "seed": self.seed,
+            "largura": self.largura,
+            "altura": self.altura,
+            "setores": [s.to_dict() for s in self.setores],
+            "palette": list(self.tiles.palette),
+            "rows": self.tiles.rle_rows(),
+            "metadados": self.metadados
+        }
+
+    def to_json_v2(self, profiler: GenerationProfiler = NULL_PROFILER) -> str:
+        """JSON v2 sem espaços, para o RobloxMapaModule"""
+        with profiler.phase("serializacao"):
+            return json.dumps(self.to_dict_v2(), separators=(",", ":"))
+
+    def to_json(self, profiler: GenerationProfiler = NULL_PROFILER) -> str:
+        buffer = io.StringIO()
+        self.write_json(buffer, profiler=profiler)
+        return buffer.getvalue()
+
+    def write_json(
+        self,
+        fp: TextIO,
+        indent: Optional[int] = 2,
+        profiler: GenerationProfiler = NULL_PROFILER
+    ) -> None:
+        """Escreve o JSON em fp linha a linha do grid, sem montar o dict dos tiles
+
+        Com indent=2 a saída é idêntica a json.dumps(self.to_dict(), indent=2);
+        indent=None gera a forma compacta, sem espaços. O tempo entra na fase
+        "serializacao" do profiler.
+        """
+        with profiler.phase("serializacao"):
+            self._write_json(fp, indent)
+
+    def _write_json(self, fp: TextIO, indent: Optional[int]) -> None:
+        if indent is None:
+            pad, sep, colon = "", "", ":"
+        else:
+            pad, sep, colon = "\n" + " " * indent, "\n", ": "
+
+        def dump(value: Any, level: int) -> str:
+            if indent is None:
+                return json.dumps(value, separators=(",", ":"))
+            return json.dumps(value, indent=indent).replace("\n", "\n" + " " * (indent * level))
+
+        header = [
+            ("id", self.id), ("seed", self.seed),
+            ("largura", self.largura), ("altura", self.altura),
+            ("setores", [s.to_dict() for s in self.setores])
+        ]
+        fp.write("{")
+        for key, value in header:
+            fp.write(f"{pad}{json.dumps(key)}{colon}{dump(value, 1)},")
+
+        fp.write(f"{pad}\"tiles\"{colon}[")
+        tile_pad = pad + (" " * indent if indent else "")
+        tile_field_pad = tile_pad + (" " * indent if indent else "")
+        tile_close = tile_pad if indent is not None else ""
+        first = True
+        row: List[str] = []
+        current_y = None
+        for tile_id, x, y in self.tiles.iter_cells():
+            if y != current_y and row:
+                # Uma escrita por linha do mapa: memória limitada à largura
+                fp.write("".join(row))
+                row = []
+            current_y = y
+            row.append(
+                f"{'' if first else ','}{tile_pad}{{"
+                f"{tile_field_pad}\"tileId\"{colon}{json.dumps(tile_id)},"
+                f"{tile_field_pad}\"x\"{colon}{x},"
+                f"{tile_field_pad}\"y\"{colon}{y}"
+                f"{tile_close}}}"
+            )
+            first = False
+        fp.write("".join(row))
+        fp.write("]," if first else f"{pad}],")
+
+        fp.write(f"{pad}\"metadados\"{colon}{dump(self.metadados, 1)}")
+        fp.write(f"{sep}}}")
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MapaGerado":
+        """Aceita o esquema v1 (lista de tiles) e o v2 (paleta + linhas RLE)"""
+        if data.get("versao") == 2:
+            tiles = TileGrid.from_rle_rows(
+                data["largura"], data["altura"], data["palette"], data["rows"]
+            )
+        else:
+            tiles = [TileInstance.from_dict(t) for t in data["tiles"]]
+        return cls(
+            id=data["id"],
+            seed=data["seed"],
+            largura=data["largura"],
+            altura=data["altura"],
+            setores=[Setor.from_dict(s) for s in data["setores"]],
+            tiles=tiles,
+            metadados=data.get("metadados", {})
+        )
 
 @dataclass
 class Intencao:
@@ -112,7 +400,7 @@ class LogEntrada:
     categoria: str
     engine_alvo: str
     seed: str
-    map_stats: Dict[str, int]
+    map_stats: Dict[str, Union[int, float]]  # contagens + tempos do profiler (ms)
     build_status: Literal["success", "error"]
     error_type: Optional[str] = None
     error_message: Optional[str] = None
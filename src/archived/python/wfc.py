@@ -5,8 +5,77 @@ Com entropia de Shannon e propagação de restrições
 
 import random
 import math
-from typing import List, Set, Tuple, Optional, Dict
-from types import Tile, WFCContradiction
+import heapq
+from typing import List, Set, Tuple, Optional, Dict, Union
+from types import Tile, TileGrid, WFCContradiction
+from tileset import CompiledTileset, compile_tileset
+
+class EntropyIndex:
+    """Heap de menor entropia com invalidação preguiçosa
+
+    Mantém por célula sum(w) e sum(w·log2 w), de modo que
+    H = log2(W) - S/W é atualizada em O(1) quando o domínio encolhe
+    e a próxima célula sai do heap em O(log n).
+    """
+
+    def __init__(
+        self,
+        size: int,
+        total_weight: float,
+        total_wlogw: float,
+        rng: Optional[random.Random] = None
+    ):
+        self.sum_w: List[float] = [total_weight] * size
+        self.sum_wlogw: List[float] = [total_wlogw] * size
+        self.active = bytearray(b"\x01") * size
+
+        # Ruído de desempate sorteado uma única vez por célula (determinístico por seed)
+        rng = rng or random
+        self.noise: List[float] = [rng.random() * 0.001 for _ in range(size)]
+
+        base = self.entropy_of(total_weight, total_wlogw)
+        self.keys: List[float] = [base + n for n in self.noise]
+        self.heap: List[Tuple[float, int]] = [(k, i) for i, k in enumerate(self.keys)]
+        heapq.heapify(self.heap)
+
+    @staticmethod
+    def entropy_of(total_weight: float, total_wlogw: float) -> float:
+        """Entropia de Shannon a partir das somas cacheadas"""
+        if total_weight <= 0:
+            return 0.0
+        return math.log2(total_weight) - total_wlogw / total_weight
+
+    def remove_weight(self, index: int, weight: float, wlogw: float) -> None:
+        """Desconta um tile removido do domínio da célula"""
+        self.sum_w[index] -= weight
+        self.sum_wlogw[index] -= wlogw
+
+    def refresh(self, index: int) -> None:
+        """Reinsere a célula com a entropia atual; entradas antigas ficam obsoletas"""
+        if not self.active[index]:
+            return
+        key = self.entropy_of(self.sum_w[index], self.sum_wlogw[index]) + self.noise[index]
+        self.keys[index] = key
+        heapq.heappush(self.heap, (key, index))
+
+    def deactivate(self, index: int) -> None:
+        """Retira a célula do índice (colapsada)"""
+        self.active[index] = 0
+
+    def reactivate(self, index: int) -> None:
+        """Devolve a célula ao índice (colapso desfeito)"""
+        self.active[index] = 1
+        self.refresh(index)
+
+    def peek_lowest(self) -> Optional[int]:
+        """Célula ativa de menor entropia, descartando entradas obsoletas"""
+        heap = self.heap
+        while heap:
+            key, index = heap[0]
+            if self.active[index] and key == self.keys[index]:
+                return index
+            heapq.heappop(heap)
+        return None
 
 class Cell:
     """Célula individual do grid WFC"""
@@ -15,25 +84,35 @@ class Cell:
         self.collapsed: bool = False
         self.tile_id: Optional[str] = None
 
-    def entropy(self, tile_weights: Dict[str, float]) -> float:
+    def entropy(
+        self,
+        tile_weights: Dict[str, float],
+        rng: Optional[random.Random] = None
+    ) -> float:
         """Calcula entropia de Shannon: H = -Σ(p * log2(p))"""
         if self.collapsed or len(self.possible) == 0:
             return 0.0
 
-        total_weight = sum(tile_weights.get(tid, 1.0) for tid in self.possible)
+        # Ordem canônica do tileset (iterar o set depende do hash das strings)
+        ordered = [tid for tid in tile_weights if tid in self.possible]
+        total_weight = sum(tile_weights[tid] for tid in ordered)
         if total_weight == 0:
             return 0.0
 
         entropy = 0.0
-        for tid in self.possible:
-            p = tile_weights.get(tid, 1.0) / total_weight
+        for tid in ordered:
+            p = tile_weights[tid] / total_weight
             if p > 0:
                 entropy -= p * math.log2(p)
 
         # Adiciona pequeno ruído para quebrar empates
-        return entropy + random.random() * 0.001
+        return entropy + (rng or random).random() * 0.001
 
-    def collapse(self, tile_weights: Dict[str, float]) -> str:
+    def collapse(
+        self,
+        tile_weights: Dict[str, float],
+        rng: Optional[random.Random] = None
+    ) -> str:
         """Colapsa célula para um tile específico com base em pesos"""
         if self.collapsed:
             return self.tile_id
@@ -41,10 +120,10 @@ class Cell:
         if len(self.possible) == 0:
             raise WFCContradiction("Célula sem possibilidades")
 
-        # Seleção ponderada
-        tiles = list(self.possible)
-        weights = [tile_weights.get(tid, 1.0) for tid in tiles]
-        self.tile_id = random.choices(tiles, weights=weights, k=1)[0]
+        # Seleção ponderada, na ordem canônica do tileset
+        tiles = [tid for tid in tile_weights if tid in self.possible]
+        weights = [tile_weights[tid] for tid in tiles]
+        self.tile_id = (rng or random).choices(tiles, weights=weights, k=1)[0]
         self.collapsed = True
         self.possible = {self.tile_id}
         return self.tile_id
@@ -52,21 +131,41 @@ class Cell:
 class WFCGrid:
     """Grid 2D para Wave Function Collapse"""
 
-    def __init__(self, width: int, height: int, tiles: List[Tile], seed: Optional[str] = None):
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        tiles: Union[List[Tile], CompiledTileset],
+        seed: Optional[str] = None
+    ):
         self.width = width
         self.height = height
-        self.tiles = {t.id: t for t in tiles}
-        self.tile_weights = {t.id: t.peso for t in tiles}
+        self.tileset = compile_tileset(tiles)
+        self.tiles = self.tileset.tiles
+        self.tile_weights = self.tileset.tile_weights
+        self.tile_wlogw = self.tileset.tile_wlogw
+        self.allowed_sets = self.tileset.allowed_sets
 
-        if seed:
-            random.seed(seed)
+        # Stream próprio: gerações concorrentes não interferem entre si
+        self.rng = random.Random(seed) if seed else random.Random()
 
         # Inicializar grid com todas as possibilidades
-        all_tile_ids = set(t.id for t in tiles)
+        all_tile_ids = set(self.tileset.tile_ids)
         self.grid: List[List[Cell]] = [
             [Cell(all_tile_ids) for _ in range(width)]
             for _ in range(height)
         ]
+        self.entropy_index = EntropyIndex(
+            width * height,
+            sum(self.tile_weights.values()),
+            sum(self.tile_wlogw.values()),
+            self.rng
+        )
+
+        # Contadores lidos pelo profiler
+        self.propagation_pops = 0
+        self.domain_removals = 0
+        self.contradictions = 0
 
     def get_cell(self, x: int, y: int) -> Optional[Cell]:
         """Pega célula ou None se fora dos limites"""
@@ -85,21 +184,10 @@ class WFCGrid:
 
     def find_lowest_entropy_cell(self) -> Optional[Tuple[int, int]]:
         """Encontra célula não colapsada com menor entropia"""
-        min_entropy = float('inf')
-        candidates = []
-
-        for y in range(self.height):
-            for x in range(self.width):
-                cell = self.grid[y][x]
-                if not cell.collapsed:
-                    entropy = cell.entropy(self.tile_weights)
-                    if entropy < min_entropy and len(cell.possible) > 0:
-                        min_entropy = entropy
-                        candidates = [(x, y)]
-                    elif abs(entropy - min_entropy) < 0.001 and len(cell.possible) > 0:
-                        candidates.append((x, y))
-
-        return random.choice(candidates) if candidates else None
+        index = self.entropy_index.peek_lowest()
+        if index is None:
+            return None
+        return index % self.width, index // self.width
 
     def propagate_constraints(self, x: int, y: int) -> None:
         """Propaga restrições a partir de uma célula"""
@@ -107,12 +195,13 @@ class WFCGrid:
 
         while stack:
             cx, cy = stack.pop()
+            self.propagation_pops += 1
             cell = self.get_cell(cx, cy)
 
             if not cell or not cell.collapsed:
                 continue
 
-            tile = self.tiles[cell.tile_id]
+            rules = self.allowed_sets
             neighbors = self.get_neighbors(cx, cy)
 
             for direction, (nx, ny) in neighbors.items():
@@ -120,23 +209,31 @@ class WFCGrid:
                 if not neighbor or neighbor.collapsed:
                     continue
 
-                # Tiles compatíveis nessa direção
-                if direction in tile.conexoes_permitidas:
-                    allowed = set(tile.conexoes_permitidas[direction])
-                else:
-                    allowed = set(self.tiles.keys())
+                # Tiles compatíveis nessa direção (pré-calculados no tileset compilado)
+                allowed = rules[direction][cell.tile_id]
 
                 # Reduzir possibilidades
-                old_size = len(neighbor.possible)
-                neighbor.possible &= allowed
+                old_possible = neighbor.possible
+                neighbor.possible = old_possible & allowed
 
                 if len(neighbor.possible) == 0:
+                    self.contradictions += 1
                     raise WFCContradiction(f"Contradição em ({nx}, {ny})")
 
-                # Se mudou, propagar recursivamente
-                if len(neighbor.possible) < old_size:
+                # Se mudou, atualizar entropia e propagar recursivamente
+                if len(neighbor.possible) < len(old_possible):
+                    self.domain_removals += len(old_possible) - len(neighbor.possible)
+                    self._update_entropy(nx, ny, old_possible, neighbor.possible)
                     stack.append((nx, ny))
 
+    def _update_entropy(self, x: int, y: int, old: Set[str], new: Set[str]) -> None:
+        """Desconta do índice os tiles removidos (ordem canônica do tileset)"""
+        index = y * self.width + x
+        for tid, weight in self.tile_weights.items():
+            if tid in old and tid not in new:
+                self.entropy_index.remove_weight(index, weight, self.tile_wlogw[tid])
+        self.entropy_index.refresh(index)
+
     def step(self) -> bool:
         """Executa um passo de colapso. Retorna True se ainda há trabalho"""
         pos = self.find_lowest_entropy_cell()
@@ -145,7 +242,10 @@ class WFCGrid:
 
         x, y = pos
         cell = self.grid[y][x]
-        cell.collapse(self.tile_weights)
+        before = len(cell.possible)
+        cell.collapse(self.tile_weights, self.rng)
+        self.domain_removals += before - 1
+        self.entropy_index.deactivate(y * self.width + x)
 
         try:
             self.propagate_constraints(x, y)
@@ -177,3 +277,13 @@ class WFCGrid:
         """Retorna tile ID em posição"""
         cell = self.get_cell(x, y)
         return cell.tile_id if cell and cell.collapsed else None
+
+    def to_tile_grid(self) -> TileGrid:
+        """Exporta as células colapsadas para o grid compacto do mapa"""
+        grid = TileGrid(self.width, self.height, palette=list(self.tile_weights))
+        for y in range(self.height):
+            for x in range(self.width):
+                tile_id = self.get_tile_at(x, y)
+                if tile_id:
+                    grid.set_tile(x, y, tile_id)
+        return grid
@@ -0,0 +1,406 @@
+"""
+EZ STUDIOS - Wave Function Collapse com domínios em bitmask
+Mesma semântica do WFCGrid, sem sets: cada domínio é um inteiro
+"""
+
+import random
+from array import array
+from typing import List, Tuple, Optional, Dict, Set, Union
+from types import Tile, TileGrid, WFCContradiction
+from wfc import EntropyIndex
+from tileset import CompiledTileset, compile_tileset, iter_bits, DIRECTIONS, OFFSETS, OPPOSITE
+
+# "collapsed": só propaga a partir de células colapsadas (igual ao WFCGrid)
+# "ac4": consistência de arco completa com contagem de suportes
+PROPAGATORS = ("collapsed", "ac4")
+
+# Entradas do trail de desfazer
+_TRAIL_DOMAIN = 0    # (tag, célula, máscara antiga, sum_w antiga, sum_wlogw antiga)
+_TRAIL_COLLAPSE = 1  # (tag, célula)
+_TRAIL_SUPPORT = 2   # (tag, célula, tile) cujos suportes foram decrementados
+
+class BitsetWFCGrid:
+    """Grid 2D para WFC com domínio de cada célula em bitmask sobre os tiles"""
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        tiles: Union[List[Tile], CompiledTileset],
+        seed: Optional[str] = None,
+        propagator: str = "collapsed",
+        backtrack_budget: int = 0
+    ):
+        if propagator not in PROPAGATORS:
+            raise ValueError(f"Propagador desconhecido: {propagator}")
+        self.propagator = propagator
+        self.width = width
+        self.height = height
+        # Tabelas do tileset compilado (compartilhadas entre grids do mesmo tileset)
+        self.tileset = compile_tileset(tiles)
+        self.tiles = self.tileset.tiles
+        self.tile_weights = self.tileset.tile_weights
+
+        # Índice denso: bit i do domínio <-> tile_ids[i]
+        self.tile_ids: List[str] = self.tileset.tile_ids
+        self.tile_index: Dict[str, int] = self.tileset.tile_index
+        self.weights: List[float] = self.tileset.weights
+        self.wlogw: List[float] = self.tileset.wlogw
+        self.full_mask = self.tileset.full_mask
+
+        # allowed[d][i]: máscara de tiles permitidos na direção d ao lado do tile i;
+        # allowed_mask(d, domínio) usa o cache de uniões do próprio tileset
+        self.allowed: List[List[int]] = self.tileset.allowed
+        self.allowed_mask = self.tileset.allowed_mask
+
+        # Stream próprio: gerações concorrentes não interferem entre si
+        self.rng = random.Random(seed) if seed else random.Random()
+
+        # Inicializar grid com todas as possibilidades
+        size = width * height
+        self.domains: List[int] = [self.full_mask] * size
+        self.collapsed = bytearray(size)
+        self.entropy_index = EntropyIndex(size, sum(self.weights), sum(self.wlogw), self.rng)
+
+        # Contadores lidos pelo profiler
+        self.propagation_pops = 0
+        self.domain_removals = 0
+        self.contradictions = 0
+
+        # Remoções (célula, tile) pendentes de propagação no modo AC-4, e as
+        # células cuja entropia só é reinserida no heap ao fim da propagação
+        self._pending: List[Tuple[int, int]] = []
+        self._stale: Set[int] = set()
+        self._trail: Optional[List[tuple]] = None
+        if propagator == "ac4":
+            self._init_supports()
+
+        # Backtracking: trail de mudanças + pilha de decisões (nunca copia o grid)
+        self.backtrack_budget = backtrack_budget
+        self.backtracks = 0
+        self._decisions: List[Tuple[int, int, int]] = []
+        if backtrack_budget > 0:
+            self._trail = []
+
+    def _init_supports(self) -> None:
+        """Inicializa suportes AC-4: supports[(i*4 + d)*n + a] = vizinhos em d compatíveis com a"""
+        n = len(self.tile_ids)
+        width, height = self.width, self.height
+        self.compat = self.tileset.compat
+        initial = [[len(self.compat[d][a]) for a in range(n)] for d in range(len(DIRECTIONS))]
+
+        # Bordas não têm vizinho: contagem fica em n e nunca é decrementada
+        border = [n] * n
+        supports: List[int] = []
+        for y in range(height):
+            for x in range(width):
+                for d, (dx, dy) in enumerate(OFFSETS):
+                    if 0 <= x + dx < width and 0 <= y + dy < height:
+                        supports.extend(initial[d])
+                    else:
+                        supports.extend(border)
+        self.supports = supports
+
+        # Tiles sem nenhum suporte saem antes do primeiro colapso
+        for i in range(width * height):
+            base = i * len(DIRECTIONS) * n
+            for k in range(len(DIRECTIONS) * n):
+                if supports[base + k] == 0:
+                    self.ban(i, k % n)
+        self._propagate_supports()
+
+    def _narrow(
+        self,
+        index: int,
+        mask: int,
+        removed: Optional[List[int]] = None,
+        refresh: bool = True
+    ) -> None:
+        """Troca o domínio da célula, registrando no trail e atualizando a entropia
+
+        removed: tiles que saem, quando quem chama já sabe (ex.: ban).
+        refresh=False deixa a reinserção no heap para quem chama.
+        """
+        old = self.domains[index]
+        entropy_index = self.entropy_index
+        if self._trail is not None:
+            self._trail.append((
+                _TRAIL_DOMAIN, index, old,
+                entropy_index.sum_w[index], entropy_index.sum_wlogw[index]
+            ))
+        self.domains[index] = mask
+
+        if not mask:
+            self.contradictions += 1
+            raise WFCContradiction(
+                f"Contradição em ({index % self.width}, {index // self.width})"
+            )
+
+        # Desconta do índice os tiles removidos (ordem crescente de bit)
+        if removed is None:
+            removed = iter_bits(old & ~mask)
+        self.domain_removals += len(removed)
+        for b in removed:
+            entropy_index.remove_weight(index, self.weights[b], self.wlogw[b])
+        if refresh:
+            entropy_index.refresh(index)
+
+    def ban(self, index: int, tile: int) -> None:
+        """Remove um tile do domínio da célula e agenda a propagação (AC-4)"""
+        mask = self.domains[index]
+        if not mask >> tile & 1:
+            return
+        self._pending.append((index, tile))
+        self._narrow(index, mask ^ (1 << tile), [tile], refresh=False)
+        self._stale.add(index)
+
+    def _ban_all_but(self, index: int, tile: int) -> None:
+        """Reduz a célula a um tile numa só troca de domínio e agenda as remoções (AC-4)"""
+        mask = self.domains[index]
+        removed = iter_bits(mask ^ (1 << tile))
+        self._pending.extend((index, b) for b in removed)
+        self._narrow(index, 1 << tile, removed)
+
+    def _propagate_supports(self) -> None:
+        """Esvazia a fila de remoções decrementando suportes e removendo transitivamente"""
+        width, height = self.width, self.height
+        n = len(self.tile_ids)
+        stride = len(DIRECTIONS) * n
+        supports = self.supports
+        domains = self.domains
+        compat = self.compat
+        pending = self._pending
+        trail = self._trail
+
+        while pending:
+            j, b = pending.pop()
+            self.propagation_pops += 1
+            if trail is not None:
+                trail.append((_TRAIL_SUPPORT, j, b))
+
+            # Decrementa tudo antes de banir, para o trail desfazer a remoção inteira
+            unsupported = []
+            jx, jy = j % width, j // width
+            for d, (dx, dy) in enumerate(OFFSETS):
+                ix, iy = jx + dx, jy + dy
+                if not (0 <= ix < width and 0 <= iy < height):
+                    continue
+                i = iy * width + ix
+                # j está na direção oposta vista de i
+                base = i * stride + OPPOSITE[d] * n
+                for a in compat[d][b]:
+                    k = base + a
+                    count = supports[k] - 1
+                    supports[k] = count
+                    if not count and domains[i] >> a & 1:
+                        unsupported.append((i, a))
+
+            for i, a in unsupported:
+                self.ban(i, a)
+
+        # Uma reinserção no heap por célula, não uma por tile removido
+        refresh = self.entropy_index.refresh
+        for i in self._stale:
+            refresh(i)
+        self._stale.clear()
+
+    def _restore_supports(self, j: int, b: int) -> None:
+        """Desfaz os decrementos feitos ao propagar a remoção de b em j"""
+        width, height = self.width, self.height
+        n = len(self.tile_ids)
+        stride = len(DIRECTIONS) * n
+        jx, jy = j % width, j // width
+        for d, (dx, dy) in enumerate(OFFSETS):
+            ix, iy = jx + dx, jy + dy
+            if not (0 <= ix < width and 0 <= iy < height):
+                continue
+            base = (iy * width + ix) * stride + OPPOSITE[d] * n
+            for a in self.compat[d][b]:
+                self.supports[base + a] += 1
+
+    def find_lowest_entropy_cell(self) -> Optional[Tuple[int, int]]:
+        """Encontra célula não colapsada com menor entropia"""
+        i = self.entropy_index.peek_lowest()
+        if i is None:
+            return None
+        return i % self.width, i // self.width
+
+    def collapse(self, x: int, y: int) -> str:
+        """Colapsa célula para um tile específico com base em pesos"""
+        i = y * self.width + x
+        mask = self.domains[i]
+        if self.collapsed[i]:
+            return self.tile_ids[iter_bits(mask)[0]]
+
+        if not mask:
+            raise WFCContradiction("Célula sem possibilidades")
+
+        bits = iter_bits(mask)
+        weights = [self.weights[b] for b in bits]
+        chosen = self.rng.choices(bits, weights=weights, k=1)[0]
+        if self._trail is not None:
+            self._trail.append((_TRAIL_COLLAPSE, i))
+        self.collapsed[i] = 1
+        self.entropy_index.deactivate(i)
+
+        if self.propagator == "ac4":
+            self._ban_all_but(i, chosen)
+        else:
+            self._narrow(i, 1 << chosen)
+        return self.tile_ids[chosen]
+
+    def pin(self, x: int, y: int, tile_id: str) -> None:
+        """Fixa a célula num tile conhecido (ex.: borda já resolvida) e propaga"""
+        i = y * self.width + x
+        tile = self.tile_index[tile_id]
+        mask = self.domains[i]
+        if not mask >> tile & 1:
+            self.contradictions += 1
+            raise WFCContradiction(f"Contradição em ({x}, {y})")
+
+        self.collapsed[i] = 1
+        self.entropy_index.deactivate(i)
+        if self.propagator == "ac4":
+            self._ban_all_but(i, tile)
+        else:
+            self._narrow(i, 1 << tile)
+        self.propagate_constraints(x, y)
+
+    def propagate_constraints(self, x: int, y: int) -> None:
+        """Propaga restrições a partir de uma célula"""
+        if self.propagator == "ac4":
+            # No AC-4 a fila de remoções já contém tudo o que mudou
+            self._propagate_supports()
+            return
+
+        width, height = self.width, self.height
+        domains = self.domains
+        collapsed = self.collapsed
+        stack = [(x, y)]
+
+        while stack:
+            cx, cy = stack.pop()
+            self.propagation_pops += 1
+            if not (0 <= cx < width and 0 <= cy < height):
+                continue
+            ci = cy * width + cx
+            if not collapsed[ci]:
+                continue
+
+            source = domains[ci]
+            for d, (dx, dy) in enumerate(OFFSETS):
+                nx, ny = cx + dx, cy + dy
+                if not (0 <= nx < width and 0 <= ny < height):
+                    continue
+                ni = ny * width + nx
+                if collapsed[ni]:
+                    continue
+
+                # Reduzir possibilidades
+                old = domains[ni]
+                new = old & self.allowed_mask(d, source)
+
+                # Se mudou, atualizar entropia e propagar recursivamente
+                if new != old:
+                    self._narrow(ni, new)
+                    stack.append((nx, ny))
+
+    def _undo(self, mark: int) -> None:
+        """Desfaz o trail até a marca, na ordem inversa"""
+        trail = self._trail
+        entropy_index = self.entropy_index
+        self._pending.clear()
+        self._stale.clear()
+        while len(trail) > mark:
+            entry = trail.pop()
+            tag = entry[0]
+            if tag == _TRAIL_DOMAIN:
+                _, i, old, sum_w, sum_wlogw = entry
+                self.domains[i] = old
+                entropy_index.sum_w[i] = sum_w
+                entropy_index.sum_wlogw[i] = sum_wlogw
+                entropy_index.refresh(i)
+            elif tag == _TRAIL_COLLAPSE:
+                i = entry[1]
+                self.collapsed[i] = 0
+                entropy_index.reactivate(i)
+            else:
+                self._restore_supports(entry[1], entry[2])
+
+    def _refute(self, index: int, tile: int) -> None:
+        """Proíbe a escolha desfeita na célula e propaga a consequência"""
+        if self.propagator == "ac4":
+            self.ban(index, tile)
+            self._propagate_supports()
+        else:
+            self._narrow(index, self.domains[index] & ~(1 << tile))
+
+    def _backtrack(self) -> None:
+        """Volta à última decisão viável dentro do orçamento de backtracking"""
+        while True:
+            if not self._decisions or self.backtracks >= self.backtrack_budget:
+                raise WFCContradiction(
+                    f"Orçamento de backtracking esgotado ({self.backtracks})"
+                )
+            self.backtracks += 1
+            mark, index, tile = self._decisions.pop()
+            self._undo(mark)
+            try:
+                self._refute(index, tile)
+                return
+            except WFCContradiction:
+                continue
+
+    def step(self) -> bool:
+        """Executa um passo de colapso. Retorna True se ainda há trabalho"""
+        pos = self.find_lowest_entropy_cell()
+        if not pos:
+            return False
+
+        x, y = pos
+        if self._trail is None:
+            self.collapse(x, y)
+            self.propagate_constraints(x, y)
+            return True
+
+        # Ponto de decisão: tudo o que vier depois pode ser desfeito
+        mark = len(self._trail)
+        tile_id = self.collapse(x, y)
+        self._decisions.append((mark, y * self.width + x, self.tile_index[tile_id]))
+        try:
+            self.propagate_constraints(x, y)
+        except WFCContradiction:
+            self._backtrack()
+        return True
+
+    def run_to_completion(self, max_iterations: int = 10000) -> None:
+        """Executa até completar ou atingir limite"""
+        iterations = 0
+        while iterations < max_iterations:
+            if not self.step():
+                break
+            iterations += 1
+
+        if iterations >= max_iterations:
+            raise WFCContradiction("Limite de iterações atingido")
+
+    def is_complete(self) -> bool:
+        """Verifica se todos estão colapsados"""
+        return all(self.collapsed)
+
+    def get_tile_at(self, x: int, y: int) -> Optional[str]:
+        """Retorna tile ID em posição"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            i = y * self.width + x
+            if self.collapsed[i]:
+                return self.tile_ids[self.domains[i].bit_length() - 1]
+        return None
+
+    def to_tile_grid(self) -> TileGrid:
+        """Exporta direto para o grid compacto: bit do domínio = código na paleta"""
+        empty = TileGrid.EMPTY
+        cells = array("H", (
+            domain.bit_length() - 1 if done else empty
+            for domain, done in zip(self.domains, self.collapsed)
+        ))
+        return TileGrid(self.width, self.height, palette=self.tile_ids, cells=cells)
@@ -0,0 +1,191 @@
+"""
+EZ STUDIOS - Wave Function Collapse em chunks
+Divide o mapa em blocos resolvidos separadamente, com bordas fixadas
+"""
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple, Optional, Dict, Any, Union
+from types import Tile, TileGrid
+from wfc_bitset import BitsetWFCGrid
+from tileset import CompiledTileset, compile_tileset
+from shared_tileset import publish_tileset
+
+# Marca de célula ainda não resolvida no grid global
+UNSET = TileGrid.EMPTY
+
+# Fases por paridade (cx % 2, cy % 2): chunks da mesma fase não compartilham borda
+PHASES: Tuple[Tuple[int, int], ...] = ((0, 0), (1, 0), (0, 1), (1, 1))
+
+def solve_chunk(
+    tiles: Union[List[Tile], CompiledTileset],
+    seed: Optional[str],
+    bounds: Tuple[int, int, int, int],
+    chunk: Tuple[int, int, int, int],
+    pins: Dict[Tuple[int, int], str],
+    engine_options: Dict[str, Any]
+) -> List[str]:
+    """Resolve um chunk isolado; executa no processo atual ou num worker
+
+    bounds: região resolvida (chunk + anel de células fixadas), em coordenadas do mapa
+    chunk: área do chunk propriamente dito; só ela é devolvida, linha a linha
+    """
+    rx, ry, rw, rh = bounds
+    grid = BitsetWFCGrid(width=rw, height=rh, tiles=tiles, seed=seed, **engine_options)
+    for (px, py), tile_id in sorted(pins.items()):
+        grid.pin(px - rx, py - ry, tile_id)
+
+    grid.run_to_completion(
+        max_iterations=rw * rh + 1 + engine_options.get("backtrack_budget", 0)
+    )
+
+    cx, cy, cw, ch = chunk
+    return [
+        grid.get_tile_at(x - rx, y - ry)
+        for y in range(cy, cy + ch)
+        for x in range(cx, cx + cw)
+    ]
+
+class ChunkedWFCGrid:
+    """WFC por chunks de tamanho fixo com as bordas vizinhas já colapsadas fixadas
+
+    Os chunks são resolvidos em quatro fases de paridade; dentro de uma fase
+    nenhum chunk encosta em outro, então todos podem rodar em paralelo num
+    pool de processos. A memória de cada solve fica limitada ao chunk.
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        tiles: Union[List[Tile], CompiledTileset],
+        seed: Optional[str] = None,
+        chunk_size: int = 64,
+        workers: int = 1,
+        propagator: str = "ac4",
+        backtrack_budget: int = 0
+    ):
+        self.width = width
+        self.height = height
+        # Compilado uma vez; nos workers volta a ser resolvido pelo fingerprint
+        self.tiles = compile_tileset(tiles)
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.engine_options: Dict[str, Any] = {
+            "propagator": propagator,
+            "backtrack_budget": backtrack_budget
+        }
+
+        self.tile_ids: List[str] = self.tiles.tile_ids
+        self.tile_index: Dict[str, int] = self.tiles.tile_index
+
+        # Grid global compacto: índice do tile por célula
+        self.result = array("H", [UNSET]) * (width * height)
+
+        self.chunks_x = (width + chunk_size - 1) // chunk_size
+        self.chunks_y = (height + chunk_size - 1) // chunk_size
+        self._phase = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def chunk_seed(self, cx: int, cy: int) -> Optional[str]:
+        """Seed do chunk: depende só da seed do mapa e da posição"""
+        if not self.seed:
+            return None
+        return f"{self.seed}:{cx}:{cy}"
+
+    def _chunk_job(self, cx: int, cy: int) -> tuple:
+        """Monta os argumentos de solve_chunk com o anel de bordas já resolvidas"""
+        size = self.chunk_size
+        x0, y0 = cx * size, cy * size
+        cw = min(size, self.width - x0)
+        ch = min(size, self.height - y0)
+
+        # Anel de 1 célula só nos lados cujo vizinho já foi resolvido
+        left = 1 if x0 > 0 and self._known(x0 - 1, y0) else 0
+        right = 1 if x0 + cw < self.width and self._known(x0 + cw, y0) else 0
+        top = 1 if y0 > 0 and self._known(x0, y0 - 1) else 0
+        bottom = 1 if y0 + ch < self.height and self._known(x0, y0 + ch) else 0
+        bounds = (x0 - left, y0 - top, cw + left + right, ch + top + bottom)
+
+        pins = {}
+        rx, ry, rw, rh = bounds
+        for y in range(ry, ry + rh):
+            for x in range(rx, rx + rw):
+                inside = x0 <= x < x0 + cw and y0 <= y < y0 + ch
+                if not inside and self._known(x, y):
+                    pins[(x, y)] = self.tile_ids[self.result[y * self.width + x]]
+
+        return (
+            self.tiles, self.chunk_seed(cx, cy), bounds,
+            (x0, y0, cw, ch), pins, self.engine_options
+        )
+
+    def _known(self, x: int, y: int) -> bool:
+        return self.result[y * self.width + x] != UNSET
+
+    def _store(self, chunk: Tuple[int, int, int, int], tile_ids: List[str]) -> None:
+        """Copia a saída de um chunk para o grid global"""
+        x0, y0, cw, ch = chunk
+        for row in range(ch):
+            base = (y0 + row) * self.width + x0
+            for col in range(cw):
+                self.result[base + col] = self.tile_index[tile_ids[row * cw + col]]
+
+    def step(self) -> bool:
+        """Resolve uma fase inteira de chunks. Retorna True se ainda há trabalho"""
+        if self._phase >= len(PHASES):
+            return False
+
+        px, py = PHASES[self._phase]
+        jobs = [
+            self._chunk_job(cx, cy)
+            for cy in range(py, self.chunks_y, 2)
+            for cx in range(px, self.chunks_x, 2)
+        ]
+
+        if self._pool is not None and len(jobs) > 1:
+            outputs = list(self._pool.map(solve_chunk, *zip(*jobs)))
+        elif self.workers > 1 and len(jobs) > 1:
+            with publish_tileset(self.tiles), ProcessPoolExecutor(max_workers=self.workers) as pool:
+                outputs = list(pool.map(solve_chunk, *zip(*jobs)))
+        else:
+            outputs = [solve_chunk(*job) for job in jobs]
+
+        for job, tile_ids in zip(jobs, outputs):
+            self._store(job[3], tile_ids)
+
+        self._phase += 1
+        return True
+
+    def run_to_completion(self, max_iterations: int = 10000) -> None:
+        """Executa todas as fases; o limite de iterações de cada chunk é o seu tamanho"""
+        if self.workers <= 1:
+            while self.step():
+                pass
+            return
+
+        # Um único pool para as quatro fases; as tabelas do tileset vão por memória compartilhada
+        with publish_tileset(self.tiles), ProcessPoolExecutor(max_workers=self.workers) as pool:
+            self._pool = pool
+            try:
+                while self.step():
+                    pass
+            finally:
+                self._pool = None
+
+    def is_complete(self) -> bool:
+        """Verifica se todos estão colapsados"""
+        return UNSET not in self.result
+
+    def get_tile_at(self, x: int, y: int) -> Optional[str]:
+        """Retorna tile ID em posição"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            index = self.result[y * self.width + x]
+            if index != UNSET:
+                return self.tile_ids[index]
+        return None
+
+    def to_tile_grid(self) -> TileGrid:
+        """O resultado já está no formato do grid compacto"""
+        return TileGrid(self.width, self.height, palette=self.tile_ids, cells=array("H", self.result))
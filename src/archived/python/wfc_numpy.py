@@ -0,0 +1,216 @@
+"""
+EZ STUDIOS - Wave Function Collapse vetorizado com NumPy
+Onda (altura, largura, n_tiles) booleana para mapas grandes
+"""
+
+import hashlib
+from array import array
+from typing import List, Tuple, Optional, Union
+import numpy as np
+from types import Tile, TileGrid, WFCContradiction
+from tileset import CompiledTileset, compile_tileset, DIRECTIONS, OFFSETS
+
+def seed_to_int(seed: str) -> int:
+    """Seed textual -> inteiro estável (hash() de str varia entre processos)"""
+    return int.from_bytes(hashlib.sha256(seed.encode("utf-8")).digest()[:8], "little")
+
+def compile_compat_matrices(tiles: Union[List[Tile], CompiledTileset]) -> np.ndarray:
+    """compat[d, a, b]: b pode ficar na direção d de a (as duas regras precisam aceitar)"""
+    tileset = compile_tileset(tiles)
+    return np.array([tileset.compat_matrix(d) for d in range(len(DIRECTIONS))], dtype=bool)
+
+class NumpyWFCGrid:
+    """Grid WFC com propagação em lote por deslocamento de vizinhos
+
+    Cada passo colapsa, de uma vez, todas as células que são mínimo local
+    de entropia num raio `batch_radius` e propaga até o ponto fixo com
+    operações AND/OR sobre a onda inteira. Se o lote gerar contradição,
+    o passo é refeito com metade das células (até uma só).
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        tiles: Union[List[Tile], CompiledTileset],
+        seed: Optional[str] = None,
+        batch_radius: int = 2
+    ):
+        self.width = width
+        self.height = height
+        self.batch_radius = batch_radius
+        self.batch_limit: Optional[int] = None
+        tiles = compile_tileset(tiles)
+        self.tile_ids: List[str] = tiles.tile_ids
+        n = len(tiles)
+
+        self.weights = np.array(tiles.weights, dtype=np.float64)
+        positive = np.where(self.weights > 0, self.weights, 1.0)
+        self.wlogw = np.where(self.weights > 0, self.weights * np.log2(positive), 0.0)
+
+        # _support[d] = compat[d].T em float: (onda @ _support[d])[a] > 0 se algum b aceita a
+        self.compat = compile_compat_matrices(tiles)
+        self._support = [
+            self.compat[d].T.astype(np.float32) for d in range(len(DIRECTIONS))
+        ]
+
+        self.rng = np.random.default_rng(seed_to_int(seed) if seed else None)
+
+        # Inicializar onda com todas as possibilidades
+        self.wave = np.ones((height, width, n), dtype=bool)
+        self.collapsed = np.zeros((height, width), dtype=bool)
+        # Ruído de desempate sorteado uma vez por célula (determinístico por seed)
+        self.noise = self.rng.random((height, width)) * 0.001
+
+        self.propagate_constraints()
+
+    def entropy(self) -> np.ndarray:
+        """Entropia de Shannon da grade inteira numa só passada"""
+        wave = self.wave.astype(np.float64)
+        total = wave @ self.weights
+        total_wlogw = wave @ self.wlogw
+        with np.errstate(divide="ignore", invalid="ignore"):
+            entropy = np.log2(total) - total_wlogw / total
+        entropy = np.where(total > 0, entropy, 0.0) + self.noise
+        entropy[self.collapsed] = np.inf
+        return entropy
+
+    def find_lowest_entropy_cell(self) -> Optional[Tuple[int, int]]:
+        """Encontra célula não colapsada com menor entropia"""
+        entropy = self.entropy()
+        flat = int(np.argmin(entropy))
+        if not np.isfinite(entropy.flat[flat]):
+            return None
+        return flat % self.width, flat // self.width
+
+    def _select_batch(self, entropy: np.ndarray) -> np.ndarray:
+        """Mínimos locais de entropia no raio: células independentes para colapsar juntas"""
+        r = self.batch_radius
+        padded = np.pad(entropy, r, mode="constant", constant_values=np.inf)
+        selected = np.isfinite(entropy)
+        for dy in range(-r, r + 1):
+            for dx in range(-r, r + 1):
+                if dx == 0 and dy == 0:
+                    continue
+                shifted = padded[r + dy:r + dy + self.height, r + dx:r + dx + self.width]
+                selected &= entropy < shifted
+        if not selected.any():
+            # Empate exato: garante progresso com o mínimo global
+            selected.flat[int(np.argmin(entropy))] = True
+        return selected
+
+    def _limit_batch(self, selected: np.ndarray, entropy: np.ndarray, limit: int) -> np.ndarray:
+        """Mantém só as `limit` células de menor entropia do lote"""
+        flat = np.flatnonzero(selected)
+        if len(flat) <= limit:
+            return selected
+        keep = flat[np.argsort(entropy.flat[flat], kind="stable")[:limit]]
+        limited = np.zeros_like(selected)
+        limited.flat[keep] = True
+        return limited
+
+    def collapse(self, mask: np.ndarray) -> None:
+        """Colapsa as células marcadas com seleção ponderada vetorizada"""
+        ys, xs = np.nonzero(mask)
+        if len(ys) == 0:
+            return
+
+        weighted = self.wave[ys, xs] * self.weights
+        cumulative = np.cumsum(weighted, axis=1)
+        total = cumulative[:, -1]
+        if np.any(total <= 0):
+            raise WFCContradiction("Célula sem possibilidades")
+
+        roll = self.rng.random(len(ys)) * total
+        chosen = np.argmax(cumulative > roll[:, None], axis=1)
+
+        self.wave[ys, xs] = False
+        self.wave[ys, xs, chosen] = True
+        self.collapsed[ys, xs] = True
+
+    def propagate_constraints(self) -> None:
+        """Consistência de arco em lote: repete AND/OR deslocados até o ponto fixo"""
+        h, w, n = self.wave.shape
+        while True:
+            flat = self.wave.reshape(-1, n).astype(np.float32)
+            new_wave = self.wave.copy()
+            for d, (dx, dy) in enumerate(OFFSETS):
+                # supported[c, a]: algum b no domínio de c pode ficar na direção d de a
+                supported = (flat @ self._support[d] > 0).reshape(h, w, n)
+                # A célula (x, y) lê o vizinho (x+dx, y+dy); bordas não restringem
+                ys_dst = slice(max(0, -dy), h - max(0, dy))
+                xs_dst = slice(max(0, -dx), w - max(0, dx))
+                ys_src = slice(max(0, dy), h - max(0, -dy))
+                xs_src = slice(max(0, dx), w - max(0, -dx))
+                new_wave[ys_dst, xs_dst] &= supported[ys_src, xs_src]
+
+            empty = ~new_wave.any(axis=2)
+            if empty.any():
+                y, x = np.argwhere(empty)[0]
+                self.wave = new_wave
+                raise WFCContradiction(f"Contradição em ({x}, {y})")
+
+            if np.array_equal(new_wave, self.wave):
+                break
+            self.wave = new_wave
+
+        # Domínio unitário já está decidido
+        self.collapsed |= self.wave.sum(axis=2) == 1
+
+    def step(self) -> bool:
+        """Colapsa um lote de células. Retorna True se ainda há trabalho"""
+        entropy = self.entropy()
+        if not np.isfinite(entropy).any():
+            return False
+
+        selected = self._select_batch(entropy)
+        if self.batch_limit is not None:
+            selected = self._limit_batch(selected, entropy, self.batch_limit)
+
+        while True:
+            wave, collapsed = self.wave.copy(), self.collapsed.copy()
+            try:
+                self.collapse(selected)
+                self.propagate_constraints()
+            except WFCContradiction:
+                count = int(selected.sum())
+                if count == 1:
+                    raise
+                # Lote conflitante: volta ao estado do passo e tenta com metade
+                self.wave, self.collapsed = wave, collapsed
+                self.batch_limit = count // 2
+                selected = self._limit_batch(selected, entropy, self.batch_limit)
+                continue
+
+            if self.batch_limit is not None:
+                self.batch_limit *= 2
+            return True
+
+    def run_to_completion(self, max_iterations: int = 10000) -> None:
+        """Executa até completar ou atingir limite"""
+        iterations = 0
+        while iterations < max_iterations:
+            if not self.step():
+                break
+            iterations += 1
+
+        if iterations >= max_iterations:
+            raise WFCContradiction("Limite de iterações atingido")
+
+    def is_complete(self) -> bool:
+        """Verifica se todos estão colapsados"""
+        return bool(self.collapsed.all())
+
+    def get_tile_at(self, x: int, y: int) -> Optional[str]:
+        """Retorna tile ID em posição"""
+        if 0 <= x < self.width and 0 <= y < self.height and self.collapsed[y, x]:
+            return self.tile_ids[int(np.argmax(self.wave[y, x]))]
+        return None
+
+    def to_tile_grid(self) -> TileGrid:
+        """Exporta direto para o grid compacto (argmax da onda, vazio se não colapsada)"""
+        codes = np.argmax(self.wave, axis=2).astype(np.uint16)
+        codes[~self.collapsed] = TileGrid.EMPTY
+        cells = array("H")
+        cells.frombytes(codes.tobytes())
+        return TileGrid(self.width, self.height, palette=self.tile_ids, cells=cells)
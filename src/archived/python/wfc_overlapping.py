@@ -0,0 +1,274 @@
+"""
+EZ STUDIOS - Wave Function Collapse sobreposto (overlapping model)
+Aprende padrões NxN de um mapa de exemplo e gera mapas parecidos
+"""
+
+import hashlib
+from array import array
+from dataclasses import dataclass, field
+from typing import List, Tuple, Optional, Dict, Union
+from types import Tile, TileGrid, MapaGerado
+from tileset import CompiledTileset, compile_tileset, DIRECTIONS
+from wfc_bitset import BitsetWFCGrid
+
+# Hash polinomial 2D módulo primo de Mersenne; acertos no hash são confirmados
+# comparando o conteúdo, então uma colisão só custa uma comparação a mais
+HASH_MOD = (1 << 61) - 1
+HASH_BASE_X = 1_000_003
+HASH_BASE_Y = 998_244_353
+
+@dataclass
+class PatternIndex:
+    """Padrões NxN distintos do exemplo (códigos da paleta, linha a linha) e suas contagens"""
+    n: int
+    palette: List[str]
+    patterns: List[Tuple[int, ...]] = field(default_factory=list)
+    counts: List[int] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+def example_grid(example: Union[MapaGerado, TileGrid]) -> TileGrid:
+    return example.tiles if isinstance(example, MapaGerado) else example
+
+def example_fingerprint(example: Union[MapaGerado, TileGrid]) -> str:
+    """Hash estável do grid de exemplo (para a chave do cache)"""
+    grid = example_grid(example)
+    digest = hashlib.sha256(f"{grid.largura}x{grid.altura}:{'|'.join(grid.palette)}:".encode("utf-8"))
+    digest.update(grid.to_bytes())
+    return digest.hexdigest()
+
+def extract_patterns(grid: TileGrid, n: int = 3, periodic: bool = False) -> PatternIndex:
+    """Conta os padrões NxN do grid em O(largura x altura)
+
+    Rolling hash em duas passadas: janelas de n células em cada linha,
+    depois janelas de n hashes de linha em cada coluna. Cada hash guarda
+    os padrões já vistos com ele; a janela é comparada com eles antes de
+    contar. Com periodic=True as janelas dão a volta nas bordas.
+    """
+    width, height = grid.largura, grid.altura
+    if n < 2:
+        raise ValueError("Padrões precisam ter n >= 2")
+    if not periodic and (width < n or height < n):
+        raise ValueError(f"Exemplo {width}x{height} menor que o padrão {n}x{n}")
+
+    span_x = width if periodic else width - n + 1
+    span_y = height if periodic else height - n + 1
+    mod = HASH_MOD
+    pow_x = pow(HASH_BASE_X, n - 1, mod)
+    pow_y = pow(HASH_BASE_Y, n - 1, mod)
+    cells = grid.cells
+
+    # Hash de cada janela horizontal de n células (código + 1: EMPTY também é símbolo),
+    # e a própria janela, para conferir o conteúdo quando o hash bate
+    row_hashes: List[List[int]] = []
+    row_windows: List[List[Tuple[int, ...]]] = []
+    for y in range(height):
+        codes = cells[y * width:(y + 1) * width].tolist()
+        if periodic:
+            codes += codes[:n - 1]
+        row_windows.append([tuple(codes[x:x + n]) for x in range(span_x)])
+        row = [code + 1 for code in codes]
+        h = 0
+        for value in row[:n]:
+            h = (h * HASH_BASE_X + value) % mod
+        hashes = [h]
+        for x in range(1, span_x):
+            h = ((h - row[x - 1] * pow_x) * HASH_BASE_X + row[x + n - 1]) % mod
+            hashes.append(h)
+        row_hashes.append(hashes)
+    if periodic:
+        row_hashes += row_hashes[:n - 1]
+        row_windows += row_windows[:n - 1]
+
+    index = PatternIndex(n, list(grid.palette))
+    seen: Dict[int, List[int]] = {}
+
+    # Janelas verticais de n hashes de linha, rolando linha a linha
+    window = [0] * span_x
+    for rows in row_hashes[:n]:
+        window = [(h * HASH_BASE_Y + r) % mod for h, r in zip(window, rows)]
+    for y in range(span_y):
+        if y:
+            out_rows, in_rows = row_hashes[y - 1], row_hashes[y + n - 1]
+            window = [
+                ((h - o * pow_y) * HASH_BASE_Y + i) % mod
+                for h, o, i in zip(window, out_rows, in_rows)
+            ]
+        for h, *parts in zip(window, *row_windows[y:y + n]):
+            pattern = sum(parts, ())
+            candidates = seen.setdefault(h, [])
+            for found in candidates:
+                if index.patterns[found] == pattern:
+                    index.counts[found] += 1
+                    break
+            else:
+                candidates.append(len(index.patterns))
+                index.patterns.append(pattern)
+                index.counts.append(1)
+
+    return index
+
+def pattern_adjacency(index: PatternIndex) -> List[List[List[int]]]:
+    """adjacency[d][a]: padrões que cabem na direção d de a (sobreposição de n-1 linhas/colunas)
+
+    Agrupa os padrões pelas bordas sobrepostas, então o custo acompanha o
+    número de pares compatíveis e não o quadrado do número de padrões.
+    """
+    n = index.n
+    without_first_col = [c for r in range(n) for c in range(r * n + 1, r * n + n)]
+    without_last_col = [c for r in range(n) for c in range(r * n, r * n + n - 1)]
+    top = slice(0, n * (n - 1))
+    bottom = slice(n, n * n)
+
+    def groups(keys: List[tuple]) -> Dict[tuple, List[int]]:
+        grouped: Dict[tuple, List[int]] = {}
+        for i, key in enumerate(keys):
+            grouped.setdefault(key, []).append(i)
+        return grouped
+
+    patterns = index.patterns
+    tops = [p[top] for p in patterns]
+    bottoms = [p[bottom] for p in patterns]
+    lefts = [tuple(p[c] for c in without_last_col) for p in patterns]
+    rights = [tuple(p[c] for c in without_first_col) for p in patterns]
+    by_top, by_bottom = groups(tops), groups(bottoms)
+    by_left, by_right = groups(lefts), groups(rights)
+
+    # b ao norte de a: as n-1 linhas de baixo de b são as n-1 de cima de a
+    neighbors = {
+        "norte": [by_bottom.get(key, []) for key in tops],
+        "sul": [by_top.get(key, []) for key in bottoms],
+        "leste": [by_left.get(key, []) for key in rights],
+        "oeste": [by_right.get(key, []) for key in lefts],
+    }
+    return [neighbors[direction] for direction in DIRECTIONS]
+
+def pattern_tileset(index: PatternIndex, tiles: Optional[List[Tile]] = None) -> CompiledTileset:
+    """Um Tile por padrão: peso = contagem, regras = adjacência derivada
+
+    O tipo vem do tile do canto superior esquerdo (a célula que o padrão
+    ocupa na saída), quando ele existe no tileset base.
+    """
+    tipos = {t.id: t.tipo for t in tiles or []}
+    adjacency = pattern_adjacency(index)
+    ids = [f"padrao_{i}" for i in range(len(index))]
+    pattern_tiles = []
+    for i, pattern in enumerate(index.patterns):
+        corner = index.palette[pattern[0]] if pattern[0] != TileGrid.EMPTY else None
+        pattern_tiles.append(Tile(
+            id=ids[i],
+            tipo=tipos.get(corner, "objeto"),
+            tags=["padrao"],
+            conexoes_permitidas={
+                direction: [ids[b] for b in adjacency[d][i]]
+                for d, direction in enumerate(DIRECTIONS)
+            },
+            peso=float(index.counts[i])
+        ))
+    return compile_tileset(pattern_tiles)
+
+class OverlappingWFCGrid:
+    """WFC sobreposto: cada posição colapsa num padrão NxN visto no exemplo
+
+    Os padrões viram tiles do BitsetWFCGrid (AC-4, necessário aqui: a
+    adjacência entre padrões é bem mais restritiva que a do tileset base).
+    O grid resolvido tem uma posição por canto de padrão; as n-1 últimas
+    linhas/colunas do mapa saem do conteúdo dos padrões da borda.
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        tiles: Union[List[Tile], CompiledTileset, None] = None,
+        seed: Optional[str] = None,
+        example: Union[MapaGerado, TileGrid, None] = None,
+        n: int = 3,
+        periodic_input: bool = False,
+        backtrack_budget: int = 0
+    ):
+        if example is None:
+            raise ValueError("O modo overlapping precisa de um mapa de exemplo (example)")
+        if width < n or height < n:
+            raise ValueError(f"Mapa {width}x{height} menor que o padrão {n}x{n}")
+        self.width = width
+        self.height = height
+        self.n = n
+
+        self.index = extract_patterns(example_grid(example), n, periodic_input)
+        self.pattern_tiles = pattern_tileset(self.index, list(tiles or []))
+        self.grid = BitsetWFCGrid(
+            width=width - n + 1,
+            height=height - n + 1,
+            tiles=self.pattern_tiles,
+            seed=seed,
+            propagator="ac4",
+            backtrack_budget=backtrack_budget
+        )
+
+    @property
+    def inner_grid(self) -> BitsetWFCGrid:
+        """Grid de padrões que faz os passos e a propagação (o profiler mede nele)"""
+        return self.grid
+
+    # Contadores lidos pelo profiler vêm do grid de padrões
+    @property
+    def propagation_pops(self) -> int:
+        return self.grid.propagation_pops
+
+    @property
+    def domain_removals(self) -> int:
+        return self.grid.domain_removals
+
+    @property
+    def contradictions(self) -> int:
+        return self.grid.contradictions
+
+    @property
+    def backtracks(self) -> int:
+        return self.grid.backtracks
+
+    def step(self) -> bool:
+        """Executa um passo de colapso. Retorna True se ainda há trabalho"""
+        return self.grid.step()
+
+    def run_to_completion(self, max_iterations: int = 10000) -> None:
+        """Executa até completar ou atingir limite"""
+        self.grid.run_to_completion(max_iterations)
+
+    def is_complete(self) -> bool:
+        """Verifica se todos estão colapsados"""
+        return self.grid.is_complete()
+
+    def _pattern_at(self, x: int, y: int) -> Optional[Tuple[Tuple[int, ...], int]]:
+        """Padrão que cobre (x, y) e a posição da célula dentro dele"""
+        px = min(x, self.width - self.n)
+        py = min(y, self.height - self.n)
+        tile_id = self.grid.get_tile_at(px, py)
+        if tile_id is None:
+            return None
+        pattern = self.index.patterns[self.pattern_tiles.tile_index[tile_id]]
+        return pattern, (y - py) * self.n + (x - px)
+
+    def get_tile_at(self, x: int, y: int) -> Optional[str]:
+        """Retorna tile ID em posição"""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        found = self._pattern_at(x, y)
+        if found is None:
+            return None
+        pattern, offset = found
+        code = pattern[offset]
+        return None if code == TileGrid.EMPTY else self.index.palette[code]
+
+    def to_tile_grid(self) -> TileGrid:
+        """Grid na paleta do exemplo (células de padrões não colapsados ficam vazias)"""
+        cells = array("H", [TileGrid.EMPTY]) * (self.width * self.height)
+        for y in range(self.height):
+            for x in range(self.width):
+                found = self._pattern_at(x, y)
+                if found is not None:
+                    pattern, offset = found
+                    cells[y * self.width + x] = pattern[offset]
+        return TileGrid(self.width, self.height, palette=self.index.palette, cells=cells)
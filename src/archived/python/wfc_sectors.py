@@ -0,0 +1,187 @@
+"""
+EZ STUDIOS - Wave Function Collapse por setor (folhas do BSP)
+Cada setor é resolvido de forma independente; as bordas entre setores são fixadas antes
+"""
+
+import random
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple, Optional, Dict, Any, Union
+from types import Tile, Setor, TileGrid, WFCContradiction
+from wfc_chunked import solve_chunk
+from tileset import CompiledTileset, compile_tileset
+from shared_tileset import publish_tileset
+
+class SectorWFCGrid:
+    """WFC independente por setor do BSP, em paralelo num pool de processos
+
+    Antes de resolver, toda célula cujo vizinho da direita ou de baixo
+    pertence a outro setor é fixada como parede; em cada trecho de borda
+    compartilhada abre-se uma passagem chão-porta-chão, com chão dos dois
+    lados da porta. Como todas as fixações são conhecidas de antemão, cada
+    setor só precisa do anel de bordas vizinhas à esquerda/acima e nenhum
+    depende do resultado de outro: o tempo acompanha o maior setor.
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        tiles: Union[List[Tile], CompiledTileset],
+        seed: Optional[str] = None,
+        setores: Optional[List[Setor]] = None,
+        workers: int = 1,
+        propagator: str = "ac4",
+        backtrack_budget: int = 0
+    ):
+        self.width = width
+        self.height = height
+        # Compilado uma vez; nos workers volta a ser resolvido pelo fingerprint
+        self.tiles = compile_tileset(tiles)
+        self.seed = seed
+        self.workers = workers
+        self.engine_options: Dict[str, Any] = {
+            "propagator": propagator,
+            "backtrack_budget": backtrack_budget
+        }
+
+        # Sem setores o mapa inteiro é um setor só
+        self.setores: List[Setor] = list(setores) if setores else [Setor("setor_0", 0, 0, width, height)]
+
+        self.tile_ids: List[str] = self.tiles.tile_ids
+        self.tile_index: Dict[str, int] = self.tiles.tile_index
+        self.wall_tile = self._tile_of_type("parede")
+        self.door_tile = self._tile_of_type("porta")
+        self.floor_tile = self._tile_of_type("chao")
+
+        self.result = array("H", [TileGrid.EMPTY]) * (width * height)
+        self._owner = self._sector_owners()
+        self.pins = self._stitch_borders()
+        self._done = False
+
+    def _tile_of_type(self, tipo: str) -> str:
+        for tile in self.tiles:
+            if tile.tipo == tipo:
+                return tile.id
+        raise ValueError(f"Tileset sem tile do tipo '{tipo}' para costurar setores")
+
+    def _sector_owners(self) -> array:
+        """Índice do setor dono de cada célula (os setores do BSP cobrem o mapa)"""
+        owner = array("i", [-1]) * (self.width * self.height)
+        for i, setor in enumerate(self.setores):
+            for y in range(setor.y, setor.y + setor.altura):
+                row = y * self.width
+                owner[row + setor.x:row + setor.x + setor.largura] = array("i", [i]) * setor.largura
+        if -1 in owner:
+            raise ValueError("Setores não cobrem o mapa inteiro")
+        return owner
+
+    def _stitch_borders(self) -> Dict[Tuple[int, int], str]:
+        """Paredes nas bordas entre setores + uma passagem com porta por par de setores vizinhos"""
+        width, height, owner = self.width, self.height, self._owner
+        pins: Dict[Tuple[int, int], str] = {}
+        # Trechos de borda por par (setor, vizinho): células da direita e de baixo separadas
+        segments: Dict[Tuple[int, int, str], List[Tuple[int, int]]] = {}
+
+        for y in range(height):
+            for x in range(width):
+                here = owner[y * width + x]
+                right = owner[y * width + x + 1] if x + 1 < width else here
+                below = owner[(y + 1) * width + x] if y + 1 < height else here
+                if right == here and below == here:
+                    continue
+                pins[(x, y)] = self.wall_tile
+                # Célula de canto (borda nas duas direções) não recebe passagem
+                if right != here and below == here:
+                    segments.setdefault((here, right, "leste"), []).append((x, y))
+                elif below != here and right == here:
+                    segments.setdefault((here, below, "sul"), []).append((x, y))
+
+        rng = random.Random(f"{self.seed}:portas") if self.seed else random.Random()
+        for (_, _, side), cells in sorted(segments.items()):
+            if len(cells) < 3:
+                continue
+            # Passagem chão-porta-chão ao longo da parede, longe das pontas
+            middle = rng.randint(1, len(cells) - 2)
+            door_x, door_y = cells[middle]
+            pins[cells[middle - 1]] = self.floor_tile
+            pins[cells[middle + 1]] = self.floor_tile
+            pins[(door_x, door_y)] = self.door_tile
+            # Chão dos dois lados da porta para a passagem não dar em parede
+            dx, dy = (1, 0) if side == "leste" else (0, 1)
+            for nx, ny in ((door_x - dx, door_y - dy), (door_x + dx, door_y + dy)):
+                if 0 <= nx < width and 0 <= ny < height and (nx, ny) not in pins:
+                    pins[(nx, ny)] = self.floor_tile
+
+        return pins
+
+    def sector_seed(self, index: int) -> Optional[str]:
+        """Seed do setor: depende só da seed do mapa e da posição do setor na lista"""
+        if not self.seed:
+            return None
+        return f"{self.seed}:setor:{index}"
+
+    def _sector_job(self, index: int) -> tuple:
+        """Argumentos de solve_chunk: setor + anel à esquerda/acima (já fixado)"""
+        setor = self.setores[index]
+        left = 1 if setor.x > 0 else 0
+        top = 1 if setor.y > 0 else 0
+        bounds = (setor.x - left, setor.y - top, setor.largura + left, setor.altura + top)
+
+        rx, ry, rw, rh = bounds
+        pins = {
+            (x, y): tile_id for (x, y), tile_id in self.pins.items()
+            if rx <= x < rx + rw and ry <= y < ry + rh
+        }
+        return (
+            self.tiles, self.sector_seed(index), bounds,
+            (setor.x, setor.y, setor.largura, setor.altura), pins, self.engine_options
+        )
+
+    def _store(self, area: Tuple[int, int, int, int], tile_ids: List[str]) -> None:
+        x0, y0, w, h = area
+        for row in range(h):
+            base = (y0 + row) * self.width + x0
+            for col in range(w):
+                self.result[base + col] = self.tile_index[tile_ids[row * w + col]]
+
+    def step(self) -> bool:
+        """Resolve todos os setores de uma vez. Retorna True se ainda há trabalho"""
+        if self._done:
+            return False
+
+        jobs = [self._sector_job(i) for i in range(len(self.setores))]
+        if self.workers > 1 and len(jobs) > 1:
+            with publish_tileset(self.tiles), ProcessPoolExecutor(max_workers=self.workers) as pool:
+                outputs = list(pool.map(solve_chunk, *zip(*jobs)))
+        else:
+            outputs = [solve_chunk(*job) for job in jobs]
+
+        for index, (job, tile_ids) in enumerate(zip(jobs, outputs)):
+            if None in tile_ids:
+                raise WFCContradiction(f"Setor {self.setores[index].id} não foi resolvido")
+            self._store(job[3], tile_ids)
+
+        self._done = True
+        return True
+
+    def run_to_completion(self, max_iterations: int = 10000) -> None:
+        """Resolve os setores; o limite de iterações de cada um é o seu tamanho"""
+        while self.step():
+            pass
+
+    def is_complete(self) -> bool:
+        """Verifica se todos estão colapsados"""
+        return TileGrid.EMPTY not in self.result
+
+    def get_tile_at(self, x: int, y: int) -> Optional[str]:
+        """Retorna tile ID em posição"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            index = self.result[y * self.width + x]
+            if index != TileGrid.EMPTY:
+                return self.tile_ids[index]
+        return None
+
+    def to_tile_grid(self) -> TileGrid:
+        """O resultado já está no formato do grid compacto"""
+        return TileGrid(self.width, self.height, palette=self.tile_ids, cells=array("H", self.result))
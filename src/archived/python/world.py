@@ -0,0 +1,247 @@
+"""
+EZ STUDIOS - Mundo aberto gerado sob demanda em chunks (cx, cy)
+Cada chunk depende só da seed do mundo e das suas coordenadas
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+from collections import OrderedDict
+from typing import List, Tuple, Optional, Dict, Any, Union
+from types import Tile, Setor, TileGrid, MapaGerado
+from wfc_chunked import solve_chunk
+from tileset import CompiledTileset, compile_tileset
+
+class ChunkedWorld:
+    """Mundo infinito de chunks gerados com WFC conforme os jogadores se aproximam
+
+    A última coluna e a última linha de cada chunk são paredes, com uma
+    passagem chão-porta-chão em cada uma. Como essas bordas saem só da
+    seed e das coordenadas, um chunk é resolvido com o anel à esquerda/acima
+    já fixado sem precisar gerar os vizinhos: a ordem de geração não muda
+    o resultado. Os chunks recentes ficam num LRU limitado; os descartados
+    vão para o disco (se disk_dir for dado) em vez de serem regenerados.
+    """
+
+    def __init__(
+        self,
+        seed: str,
+        tiles: Union[List[Tile], CompiledTileset],
+        chunk_size: int = 32,
+        max_chunks: int = 64,
+        disk_dir: Optional[str] = None,
+        propagator: str = "ac4",
+        backtrack_budget: int = 0
+    ):
+        if chunk_size < 4:
+            raise ValueError("chunk_size mínimo é 4 (passagem chão-porta-chão na borda)")
+        if max_chunks < 1:
+            raise ValueError("max_chunks deve ser pelo menos 1")
+
+        self.seed = seed
+        self.tiles = compile_tileset(tiles)
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self.engine_options: Dict[str, Any] = {
+            "propagator": propagator,
+            "backtrack_budget": backtrack_budget
+        }
+
+        self.tile_ids: List[str] = self.tiles.tile_ids
+        self.wall_tile = self._tile_of_type("parede")
+        self.door_tile = self._tile_of_type("porta")
+        self.floor_tile = self._tile_of_type("chao")
+
+        self.generated = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self._chunks: "OrderedDict[Tuple[int, int], TileGrid]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Um subdiretório por mundo: seeds/tilesets diferentes nunca se misturam
+        self.disk_dir = None
+        if disk_dir:
+            self.disk_dir = os.path.join(disk_dir, self.world_key())
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def _tile_of_type(self, tipo: str) -> str:
+        for tile in self.tiles:
+            if tile.tipo == tipo:
+                return tile.id
+        raise ValueError(f"Tileset sem tile do tipo '{tipo}' para as bordas dos chunks")
+
+    def world_key(self) -> str:
+        """Identifica o mundo: seed + tileset + tamanho de chunk"""
+        payload = json.dumps(
+            {"seed": self.seed, "tileset": self.tiles.fingerprint, "chunkSize": self.chunk_size},
+            sort_keys=True,
+            separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def chunk_seed(self, cx: int, cy: int) -> str:
+        return f"{self.seed}:chunk:{cx}:{cy}"
+
+    def chunk_of(self, x: int, y: int) -> Tuple[int, int]:
+        """Chunk que contém a posição (x, y) do mundo"""
+        return x // self.chunk_size, y // self.chunk_size
+
+    def edge_pins(self, cx: int, cy: int) -> Dict[Tuple[int, int], str]:
+        """Fixações da borda leste e sul do chunk, em coordenadas do mundo
+
+        Inclui o chão encostado na porta do lado do chunk vizinho.
+        """
+        size = self.chunk_size
+        x0, y0 = cx * size, cy * size
+        right, bottom = x0 + size - 1, y0 + size - 1
+        pins: Dict[Tuple[int, int], str] = {}
+
+        for y in range(y0, y0 + size):
+            pins[(right, y)] = self.wall_tile
+        for x in range(x0, x0 + size):
+            pins[(x, bottom)] = self.wall_tile
+
+        # Trecho sem o canto; a porta fica longe das pontas
+        for side, cells, (dx, dy) in (
+            ("leste", [(right, y) for y in range(y0, bottom)], (1, 0)),
+            ("sul", [(x, bottom) for x in range(x0, right)], (0, 1)),
+        ):
+            rng = random.Random(f"{self.seed}:borda:{cx}:{cy}:{side}")
+            middle = rng.randint(1, len(cells) - 2)
+            door_x, door_y = cells[middle]
+            pins[cells[middle - 1]] = self.floor_tile
+            pins[cells[middle + 1]] = self.floor_tile
+            pins[(door_x, door_y)] = self.door_tile
+            pins[(door_x - dx, door_y - dy)] = self.floor_tile
+            pins[(door_x + dx, door_y + dy)] = self.floor_tile
+
+        return pins
+
+    def _solve(self, cx: int, cy: int) -> TileGrid:
+        """Resolve o chunk com o anel à esquerda/acima vindo das bordas dos vizinhos"""
+        size = self.chunk_size
+        x0, y0 = cx * size, cy * size
+        bounds = (x0 - 1, y0 - 1, size + 1, size + 1)
+
+        pins: Dict[Tuple[int, int], str] = {}
+        for nx, ny in ((cx - 1, cy - 1), (cx, cy - 1), (cx - 1, cy), (cx, cy)):
+            for (x, y), tile_id in self.edge_pins(nx, ny).items():
+                if x0 - 1 <= x < x0 + size and y0 - 1 <= y < y0 + size:
+                    pins[(x, y)] = tile_id
+
+        tile_ids = solve_chunk(
+            self.tiles, self.chunk_seed(cx, cy), bounds,
+            (x0, y0, size, size), pins, self.engine_options
+        )
+        grid = TileGrid(size, size, palette=self.tile_ids)
+        index = self.tiles.tile_index
+        for i, tile_id in enumerate(tile_ids):
+            grid.cells[i] = index[tile_id]
+        return grid
+
+    def _disk_path(self, cx: int, cy: int) -> str:
+        return os.path.join(self.disk_dir, f"chunk_{cx}_{cy}.bin")
+
+    def _load_spilled(self, cx: int, cy: int) -> Optional[TileGrid]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(cx, cy), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        return TileGrid.from_bytes(self.chunk_size, self.chunk_size, self.tile_ids, data)
+
+    def _spill(self, coords: Tuple[int, int], grid: TileGrid) -> None:
+        """Grava o chunk descartado do LRU (escrita atômica, como o MapCache)"""
+        if not self.disk_dir:
+            return
+        path = self._disk_path(*coords)
+        if os.path.exists(path):
+            return
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(grid.to_bytes())
+        os.replace(tmp_path, path)
+
+    def get_chunk(self, cx: int, cy: int) -> TileGrid:
+        """Grid do chunk: LRU, depois disco, depois geração"""
+        coords = (cx, cy)
+        with self._lock:
+            grid = self._chunks.get(coords)
+            if grid is not None:
+                self._chunks.move_to_end(coords)
+                self.hits += 1
+                return grid
+
+        grid = self._load_spilled(cx, cy)
+        if grid is not None:
+            with self._lock:
+                self.hits += 1
+                self.disk_hits += 1
+        else:
+            grid = self._solve(cx, cy)
+            with self._lock:
+                self.generated += 1
+
+        evicted = []
+        with self._lock:
+            self._chunks[coords] = grid
+            self._chunks.move_to_end(coords)
+            while len(self._chunks) > self.max_chunks:
+                evicted.append(self._chunks.popitem(last=False))
+                self.evictions += 1
+        for old_coords, old_grid in evicted:
+            self._spill(old_coords, old_grid)
+        return grid
+
+    def get_tile_at(self, x: int, y: int) -> str:
+        """Tile numa posição do mundo (aceita coordenadas negativas)"""
+        cx, cy = self.chunk_of(x, y)
+        size = self.chunk_size
+        return self.get_chunk(cx, cy).get_tile_at(x - cx * size, y - cy * size)
+
+    def chunks_around(self, x: int, y: int, radius: int = 1) -> List[Tuple[int, int]]:
+        """Chunks num raio (em chunks) ao redor da posição, do mais próximo ao mais distante"""
+        ccx, ccy = self.chunk_of(x, y)
+        coords = [
+            (ccx + dx, ccy + dy)
+            for dy in range(-radius, radius + 1)
+            for dx in range(-radius, radius + 1)
+        ]
+        coords.sort(key=lambda c: (max(abs(c[0] - ccx), abs(c[1] - ccy)), c[1], c[0]))
+        return coords
+
+    def ensure_around(self, x: int, y: int, radius: int = 1) -> List[Tuple[int, int]]:
+        """Garante os chunks perto do jogador; o do próprio jogador sai primeiro"""
+        coords = self.chunks_around(x, y, radius)
+        for cx, cy in coords:
+            self.get_chunk(cx, cy)
+        return coords
+
+    def chunk_mapa(self, cx: int, cy: int) -> MapaGerado:
+        """Chunk como MapaGerado (para os adaptadores de exportação)"""
+        size = self.chunk_size
+        return MapaGerado(
+            id=f"{self.world_key()}_{cx}_{cy}",
+            seed=self.chunk_seed(cx, cy),
+            setores=[Setor(f"chunk_{cx}_{cy}", 0, 0, size, size)],
+            tiles=self.get_chunk(cx, cy),
+            largura=size,
+            altura=size,
+            metadados={"chunk": {"cx": cx, "cy": cy, "origem": [cx * size, cy * size]}}
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de geração/cache e ocupação do LRU"""
+        with self._lock:
+            return {
+                "generated": self.generated,
+                "hits": self.hits,
+                "diskHits": self.disk_hits,
+                "evictions": self.evictions,
+                "chunks": len(self._chunks)
+            }